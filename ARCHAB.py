@@ -1,4 +1,8 @@
 import streamlit as st
+import warmup
+
+# Loads the data pages' modules, Sheets client and datasets in the background while the intro is read
+warmup.prewarm()
 
 # ------------------ PAGE CONFIG ------------------
 st.set_page_config(page_title="INTRODUCTION", page_icon="🏥", layout="wide")
@@ -0,0 +1,317 @@
+import logging
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import store
+from sheet_sync import add_listener
+
+# -------------------------
+# Vitals Alert Engine
+# -------------------------
+# Rules are evaluated in one vectorized pass over the rows each sync brings in.
+# A small amount of state is carried between passes (whether a rule was already
+# breached at the end of the last batch, when a sustained breach started, the
+# recent readings needed for rate-of-change rules), so an ongoing episode
+# raises exactly one event. Events are deduplicated on (rule, start time),
+# appended to the local store and handed to a background notifier.
+#
+# Every tracked dataset (one per patient) has its own carried state and its
+# own event log; all of them share one notifier.
+#
+# Rule kinds:
+#   threshold - value above/below a limit
+#   sustained - threshold breached for at least `duration` seconds
+#   rate      - value changed by at least `change` from a reading at most
+#               `window` seconds earlier
+
+logger = logging.getLogger(__name__)
+
+ALERTS_DATASET = "alerts"
+NOTIFY_MAX_AGE = pd.Timedelta(hours=1)  # older events (e.g. history replayed on start) are logged but not sent
+
+ALERT_RULES = [
+    {"id": "temperature_high", "kind": "threshold", "metric": "Temperature", "above": 99.5, "label": "High temperature"},
+    {"id": "heart_rate_low", "kind": "threshold", "metric": "Heart Rate", "below": 60, "label": "Low heart rate"},
+    {"id": "heart_rate_high", "kind": "threshold", "metric": "Heart Rate", "above": 100, "label": "High heart rate"},
+    {"id": "spo2_low", "kind": "threshold", "metric": "SpO2", "below": 95, "label": "Low SpO2"},
+    {"id": "heart_rate_high_sustained", "kind": "sustained", "metric": "Heart Rate", "above": 100, "duration": 120, "label": "Heart rate above 100 for 2 min"},
+    {"id": "spo2_drop", "kind": "rate", "metric": "SpO2", "change": -4, "window": 60, "label": "SpO2 dropped 4 points within 1 min"},
+]
+
+
+def _empty_events():
+    return pd.DataFrame({
+        "Timestamp": pd.Series(dtype="datetime64[ns]"),
+        "Rule": pd.Series(dtype="object"),
+        "Metric": pd.Series(dtype="object"),
+        "Value": pd.Series(dtype="float64"),
+        "Message": pd.Series(dtype="object"),
+        "Key": pd.Series(dtype="object"),
+    })
+
+
+def breach_mask(frame, metric, rules=ALERT_RULES):
+    # Readings that breach any threshold rule on `metric` (used to keep them when plotting)
+    mask = pd.Series(False, index=frame.index)
+    for rule in rules:
+        if rule["kind"] == "threshold" and rule["metric"] == metric:
+            mask |= _breached(rule, frame[metric])
+    return mask
+
+
+def _breached(rule, values):
+    mask = pd.Series(False, index=values.index)
+    if "above" in rule:
+        mask |= values > rule["above"]
+    if "below" in rule:
+        mask |= values < rule["below"]
+    return mask
+
+
+def _run_starts(hit, carried):
+    # First row of every run of hits; a run continuing from the previous batch is not new
+    previous = hit.shift(1, fill_value=carried)
+    return hit & ~previous
+
+
+def _threshold_hits(rule, rows, carry):
+    hit = _breached(rule, rows[rule["metric"]])
+    starts = _run_starts(hit, carry.get("open", False))
+    carry["open"] = bool(hit.iloc[-1])
+    return rows["Timestamp"][starts], rows[rule["metric"]][starts]
+
+
+def _sustained_hits(rule, rows, carry):
+    breached = _breached(rule, rows[rule["metric"]])
+    timestamps = rows["Timestamp"]
+
+    run_id = (breached != breached.shift(1, fill_value=not breached.iloc[0])).cumsum()
+    run_start = timestamps.groupby(run_id).transform("first")
+    first_run = run_id == run_id.iloc[0]
+    if carry.get("start") is not None and breached.iloc[0]:
+        run_start = run_start.mask(first_run, carry["start"])
+
+    hit = breached & (timestamps - run_start >= pd.Timedelta(seconds=rule["duration"]))
+    fired = hit & (hit.groupby(run_id).cumsum() == 1)
+    if carry.get("fired") and breached.iloc[0]:
+        fired &= ~first_run
+
+    # Carry the open run (if any) into the next batch
+    if breached.iloc[-1]:
+        last_run = run_id == run_id.iloc[-1]
+        already = bool(carry.get("fired")) and breached.iloc[0] and bool(last_run.iloc[0])
+        carry.update(start=run_start.iloc[-1], fired=already or bool(hit[last_run].any()))
+    else:
+        carry.update(start=None, fired=False)
+
+    return run_start[fired], rows[rule["metric"]][fired]
+
+
+def _rate_mask(rule, times, values):
+    # Readings at least `change` away from the highest (for a drop) or lowest (for a rise)
+    # reading within the `window` seconds up to and including them
+    rolling = pd.Series(values, index=pd.DatetimeIndex(times)).rolling(pd.Timedelta(seconds=rule["window"]), closed="both")
+    if rule["change"] < 0:
+        return values - rolling.max().to_numpy() <= rule["change"]
+    return values - rolling.min().to_numpy() >= rule["change"]
+
+
+def _rate_hits(rule, rows, carry):
+    metric = rule["metric"]
+    window = pd.Timedelta(seconds=rule["window"])
+    context = carry.get("context")
+    history = rows[["Timestamp", metric]] if context is None else pd.concat([context, rows[["Timestamp", metric]]])
+
+    hit = _rate_mask(rule, history["Timestamp"].to_numpy(), history[metric].to_numpy(dtype="float64"))
+    hit = pd.Series(hit[len(history) - len(rows):], index=rows.index)
+
+    starts = _run_starts(hit, carry.get("open", False))
+    carry["open"] = bool(hit.iloc[-1])
+    # Exactly the readings a later reading's window can still reach
+    carry["context"] = history[history["Timestamp"] >= history["Timestamp"].iloc[-1] - window]
+    return rows["Timestamp"][starts], rows[metric][starts]
+
+
+_EVALUATORS = {"threshold": _threshold_hits, "sustained": _sustained_hits, "rate": _rate_hits}
+
+
+def _hit_mask(rule, frame):
+    # Rows of `frame` (sorted by Timestamp) inside an episode of `rule`
+    values = frame[rule["metric"]]
+    if rule["kind"] != "rate":
+        return _breached(rule, values).to_numpy()
+    return _rate_mask(rule, frame["Timestamp"].to_numpy(), values.to_numpy(dtype="float64"))
+
+
+def episode_ends(events, frame, rules=ALERT_RULES):
+    # Time of the last reading in each event's episode; an episode still open runs to the last reading
+    ends = events["Timestamp"].copy()
+    if events.empty or frame.empty:
+        return ends
+    times = frame["Timestamp"].to_numpy()
+    for rule in rules:
+        of_rule = (events["Rule"] == rule["id"]).to_numpy()
+        if not of_rule.any():
+            continue
+        clear = np.flatnonzero(~_hit_mask(rule, frame))
+        starts = np.searchsorted(times, events["Timestamp"].to_numpy()[of_rule])
+        after = np.searchsorted(clear, starts)
+        last = np.where(after < len(clear), clear[np.clip(after, 0, len(clear) - 1)] - 1, len(times) - 1)
+        ends[of_rule] = np.maximum(times[np.clip(last, 0, None)], events["Timestamp"].to_numpy()[of_rule])
+    return ends
+
+
+def evaluate_rules(rows, carry, rules=ALERT_RULES):
+    # One pass over `rows` (sorted by Timestamp); `carry` holds per-rule state between batches
+    if rows.empty:
+        return _empty_events()
+
+    found = []
+    for rule in rules:
+        timestamps, values = _EVALUATORS[rule["kind"]](rule, rows, carry.setdefault(rule["id"], {}))
+        if timestamps.empty:
+            continue
+        found.append(pd.DataFrame({
+            "Timestamp": timestamps.to_numpy(),
+            "Rule": rule["id"],
+            "Metric": rule["metric"],
+            "Value": values.to_numpy().astype("float64").round(2),
+            "Message": rule["label"],
+        }))
+
+    if not found:
+        return _empty_events()
+    events = pd.concat(found, ignore_index=True)
+    events["Key"] = events["Rule"] + "|" + events["Timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return events.sort_values("Timestamp", ignore_index=True)
+
+
+# -------------------------
+# Notifications
+# -------------------------
+
+def smtp_sender(host, port, sender, recipients, username=None, password=None, use_tls=False):
+    # Works against any SMTP server, e.g. a local stand-in: python -m aiosmtpd -n -l localhost:1025
+    def send(events):
+        msg = EmailMessage()
+        patient = f" for {events['Patient'].iloc[0]}" if "Patient" in events else ""
+        msg["Subject"] = f"🚨 {len(events)} vitals alert(s){patient}"
+        msg["From"] = sender
+        msg["To"] = ", ".join(recipients)
+        msg.set_content("\n".join(
+            f"{ts:%d-%m-%Y %H:%M:%S}  {message} ({metric}: {value:g})"
+            for ts, message, metric, value in zip(events["Timestamp"], events["Message"], events["Metric"], events["Value"])
+        ))
+        with smtplib.SMTP(host, port, timeout=10) as smtp:
+            if use_tls:
+                smtp.starttls()
+            if username:
+                smtp.login(username, password)
+            smtp.send_message(msg)
+
+    return send
+
+
+def _sender_from_secrets():
+    # [email] host, port, sender, recipients and optionally username, password, use_tls
+    try:
+        config = dict(st.secrets["email"])
+    except (KeyError, FileNotFoundError):
+        return None
+    return smtp_sender(
+        config["host"], int(config.get("port", 25)), config["sender"], list(config["recipients"]),
+        config.get("username"), config.get("password"), bool(config.get("use_tls", False)),
+    )
+
+
+_SENDER = {"send": None, "configured": False}
+
+
+def set_alert_sender(send):
+    # send(events_frame); None disables notifications
+    _SENDER.update(send=send, configured=True)
+
+
+def _notify_worker(outbox):
+    while True:
+        events = outbox.get()
+        if not _SENDER["configured"]:
+            _SENDER.update(send=_sender_from_secrets(), configured=True)
+        if _SENDER["send"] is None:
+            continue
+        try:
+            _SENDER["send"](events)
+        except Exception:
+            logger.exception("Failed to send %d alert(s)", len(events))
+
+
+# -------------------------
+# Engine state and event log
+# -------------------------
+
+@st.cache_resource(show_spinner=False)
+def _engines():
+    outbox = queue.Queue()
+    threading.Thread(target=_notify_worker, args=(outbox,), name="alert-notifier", daemon=True).start()
+    return {"lock": threading.Lock(), "logs": {}, "outbox": outbox}
+
+
+def _engine(log_dataset):
+    engines = _engines()
+    with engines["lock"]:
+        engine = engines["logs"].get(log_dataset)
+        if engine is None:
+            log = store.read(log_dataset)
+            if log.empty:
+                log = _empty_events()
+            engine = engines["logs"][log_dataset] = {"lock": threading.Lock(), "log": log, "keys": set(log["Key"]), "carry": {}}
+    return engine
+
+
+def _ingest(log_dataset, label, rows, reset):
+    engine = _engine(log_dataset)
+    with engine["lock"]:
+        if reset:
+            engine["carry"] = {}
+        events = evaluate_rules(rows, engine["carry"])
+        events = events[~events["Key"].isin(engine["keys"])]
+        if events.empty:
+            return
+
+        engine["keys"].update(events["Key"])
+        log = engine["log"]
+        if log.empty:
+            engine["log"] = events
+        else:
+            # Keep the log in time order (pages take its last row as the latest event); a full
+            # re-evaluation can find events older than the ones already logged
+            engine["log"] = pd.concat([log, events], ignore_index=True)
+            if events["Timestamp"].iat[0] < log["Timestamp"].iat[-1]:
+                engine["log"] = engine["log"].sort_values("Timestamp", kind="stable", ignore_index=True)
+        store.append(log_dataset, events)
+
+    recent = events[events["Timestamp"] >= pd.Timestamp.now() - NOTIFY_MAX_AGE]
+    if not recent.empty:
+        _engines()["outbox"].put(recent if label is None else recent.assign(Patient=label))
+
+
+def track_alerts(dataset, log_dataset=ALERTS_DATASET, label=None):
+    # Evaluates the rules on `dataset` and keeps the events in `log_dataset`; `label` names the patient in notifications
+    def on_change(frame, new_rows):
+        if new_rows is None:
+            _ingest(log_dataset, label, frame, reset=True)
+        else:
+            _ingest(log_dataset, label, new_rows, reset=False)
+
+    add_listener(dataset, "alerts", on_change)
+
+
+def alert_log(log_dataset=ALERTS_DATASET):
+    # Persistent, deduplicated event log (oldest first)
+    return _engine(log_dataset)["log"]
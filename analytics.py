@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import query
+from alerts import breach_mask, episode_ends
+from daily_stats import daily_summary, summarize_days
+from downsample import downsample_lines
+from schema import date_view
+from trends import BASELINE_BAND, TREND_WINDOWS, deviation, latest_baseline, trend_rows
+
+# -------------------------
+# Page Analytics
+# -------------------------
+# The computations behind the pages, without any st.* output. Inputs are the
+# loaders' frames (see schema.py for their columns), daily rollups
+# (daily_stats.py) and alert logs (alerts.py); outputs are plain frames, dicts
+# and scalars, so every function can be run and timed headless.
+#
+# memoized(key, fn, *data, **params) caches fn(*data, **params) on the key that
+# identifies `data` (e.g. the dataset and its version) plus the parameters, so
+# a widget that does not change either reuses the previous result. Results are
+# kept as they are (st.cache_resource), not pickled per hit, and shared by all
+# sessions; each caller gets shallow copies of the frames in them, which pandas'
+# copy-on-write keeps from ever writing to the cached ones.
+
+MEMO_ENTRIES = 64
+ALIGN_DAY = pd.Timestamp(2000, 1, 1)
+
+
+@st.cache_resource(show_spinner=False, max_entries=MEMO_ENTRIES)
+def _memoized(name, key, params, _fn, _data):
+    return _fn(*_data, **dict(params))
+
+
+def _read_only(value):
+    # The cached result as the caller may use it: frames and arrays can no longer write to the cached copy
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, np.ndarray):
+        value = value.view()
+        value.flags.writeable = False
+        return value
+    if isinstance(value, (tuple, list)):
+        return type(value)(_read_only(item) for item in value)
+    if isinstance(value, dict):
+        return {name: _read_only(item) for name, item in value.items()}
+    return value
+
+
+def memoized(key, fn, *data, **params):
+    # `key` must change whenever `data` does, e.g. (dataset, dataset_version(dataset))
+    return _read_only(_memoized(f"{fn.__module__}.{fn.__qualname__}", key, tuple(sorted(params.items())), fn, data))
+
+
+# -------------------------
+# Latest readings and calories
+# -------------------------
+
+def latest_readings(temp_df, score_df, user_weight, timer, MET, mode, means=None):
+    # {label: (latest value, change)} for the metric tiles; the change is against the
+    # previous reading or otherwise against `means` (all-time or baseline values; frame means when None)
+    if means is None:
+        means = {col: temp_df[col].mean() for col in ["Temperature", "Heart Rate", "SpO2"]}
+        means["Score"] = score_df["Score"].mean()
+
+    latest = temp_df.iloc[-1]
+    previous = temp_df.iloc[-2] if mode == "Previous Reading" else means
+    latest_score = score_df["Score"].iloc[-1]
+    prev_score = score_df["Score"].iloc[-2] if mode == "Previous Reading" else means["Score"]
+
+    # The per-kick duration comes from the latest score and is applied to both sides
+    latest_kicks, prev_kicks = latest_score / 10, prev_score / 10
+    kick_duration_sec = timer / latest_kicks if latest_kicks > 0 else 1
+    latest_calories = MET * user_weight * (latest_kicks * kick_duration_sec) / 3600
+    prev_calories = MET * user_weight * (prev_kicks * kick_duration_sec) / 3600
+
+    return {
+        "Temperature": (latest["Temperature"], latest["Temperature"] - previous["Temperature"]),
+        "Heart Rate (BPM)": (latest["Heart Rate"], latest["Heart Rate"] - previous["Heart Rate"]),
+        "SpO₂ (%)": (latest["SpO2"], latest["SpO2"] - previous["SpO2"]),
+        "Score": (latest_score, latest_score - prev_score),
+        "Calories Burned": (latest_calories, latest_calories - prev_calories),
+    }
+
+
+def latest_baselines(trends):
+    # Each metric's EWMA baseline at its latest reading, from trends (trends.py)
+    means = {}
+    for trend in trends:
+        means.update(latest_baseline(trend))
+    return means
+
+
+def history_means(rollups):
+    # All-history mean per metric from daily rollups
+    means = {}
+    for rollup in rollups:
+        summary = summarize_days(rollup, rollup["stats"]["Date"].unique())
+        means.update(zip(summary["Metric"], summary["mean"]))
+    return means
+
+
+def calories_over_time(score_df, user_weight, timer, MET):
+    # Date, Score and Calories Burned per score row
+    kicks = score_df["Score"] / 10
+    return pd.DataFrame({
+        "Date": date_view(score_df),
+        "Score": score_df["Score"],
+        "Calories Burned": MET * user_weight * (kicks * (timer / kicks) / 3600),
+    })
+
+
+# -------------------------
+# Daily statistics
+# -------------------------
+
+def days_summary(rollup, days, metrics):
+    # Count, mean, median, max and min per metric over `days`, merged exactly from the rollup
+    summary = summarize_days(rollup, pd.DatetimeIndex(days)).set_index("Metric").reindex(metrics)
+    summary = summary.reset_index().rename(columns={
+        "count": "Count", "mean": "Mean", "median": "Median", "max": "Max", "min": "Min"
+    })
+    summary["Count"] = summary["Count"].fillna(0).astype(int)
+    return summary[["Metric", "Count", "Mean", "Median", "Max", "Min"]]
+
+
+def daily_stats_long(rollup, metrics):
+    # One row per (Date text, Metric, Stat) for the statistics charts
+    daily = daily_summary(rollup)
+    daily = daily[daily["Metric"].isin(metrics)]
+    combined = daily[["Date", "Metric", "count", "mean", "median", "max", "min"]].assign(
+        Date=daily["Date"].dt.strftime("%d-%m-%Y")
+    )
+    return combined.melt(id_vars=["Date", "Metric"], var_name="Stat", value_name="Value")
+
+
+def score_table(rollup):
+    # Total, average, min and max score per date
+    daily = daily_summary(rollup)
+    return pd.DataFrame({
+        "Date": daily["Date"].dt.date,
+        "Total Score": daily["sum"],
+        "Average Score": daily["mean"],
+        "Min Score": daily["min"],
+        "Max Score": daily["max"],
+    })
+
+
+def calories_per_day(table, user_weight, timer, MET):
+    # score_table rows plus kicks, duration and calories; the timer is spread over all selected kicks
+    table = table.copy()
+    table["Total Kicks"] = table["Total Score"] / 10
+    kick_duration_per_kick = timer / table["Total Kicks"].sum()
+    table["Duration (hrs)"] = (table["Total Kicks"] * kick_duration_per_kick) / 3600
+    table["Calories Burned"] = MET * user_weight * table["Duration (hrs)"]
+    return table
+
+
+# -------------------------
+# Readings
+# -------------------------
+
+def aligned_readings(df, dates, seconds):
+    # Readings on `dates` within the TimeOfDay range, every day placed on the same
+    # reference day so times line up across dates
+    selected = query.select_rows(df, dates, seconds)
+    return selected.assign(Timestamp=ALIGN_DAY + pd.to_timedelta(selected["TimeOfDay"], unit="s"))
+
+
+def chart_series(readings, metric, method):
+    # (points to plot, points dropped, abnormal readings) for one metric; each day is
+    # downsampled on its own and abnormal readings are always kept
+    abnormal = breach_mask(readings, metric)
+    plot_df, dropped = downsample_lines(readings, "Timestamp", metric, readings["DateKey"], method, keep_mask=abnormal)
+    return plot_df, dropped, int(abnormal.sum())
+
+
+def trend_overlay(readings, trends, metric):
+    # Timestamp and DateKey of `readings` with the metric's rolling means, baseline band and deviation
+    table = trend_rows(trends, readings.index, metric)
+    baseline, std = table[f"{metric} baseline"], table[f"{metric} baseline std"]
+    overlay = readings[["Timestamp", "DateKey"]].assign(**{
+        f"Mean {label}": table[f"{metric} mean {label}"] for label in TREND_WINDOWS
+    })
+    overlay["Baseline"] = baseline
+    overlay["Baseline low"] = baseline - BASELINE_BAND * std
+    overlay["Baseline high"] = baseline + BASELINE_BAND * std
+    overlay["Deviation"] = deviation(readings[metric], table, metric)
+    return overlay
+
+
+def alerts_in_window(events, readings, dates, seconds):
+    # Alert events whose episode overlaps the TimeOfDay range on any of `dates`,
+    # with the episode's last reading in "End" (from `readings`, the full frame)
+    events = events.assign(End=episode_ends(events, readings))
+    low, high = pd.Timedelta(seconds=seconds[0]), pd.Timedelta(seconds=seconds[1])
+    overlaps = np.zeros(len(events), dtype=bool)
+    for day in pd.to_datetime(list(dates)):
+        overlaps |= ((events["Timestamp"] < day + high) & (events["End"] >= day + low)).to_numpy()
+    return events[overlaps]
+
+
+def recent_alerts(events, now, window=pd.Timedelta(hours=24)):
+    return events[events["Timestamp"] >= now - window]
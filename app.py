@@ -0,0 +1,22 @@
+from contextlib import asynccontextmanager
+
+import streamlit as st
+
+import warmup
+from exports import export_routes
+
+# -------------------------
+# Server Entry Point
+# -------------------------
+# `streamlit run app.py` serves the same pages as `streamlit run ARCHAB.py`,
+# but starts the warm-up (warmup.py) as soon as the server is up instead of on
+# the first visit, and streams dataset exports from disk (exports.py).
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    warmup.prewarm()
+    yield
+
+
+app = st.App("ARCHAB.py", lifespan=_lifespan, routes=export_routes())
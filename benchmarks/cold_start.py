@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# -------------------------
+# Cold Start Benchmark
+# -------------------------
+# Time to the first useful page of a fresh server process, with and without
+# the warm-up (warmup.py):
+#
+#   python -m benchmarks.cold_start                      # 100k readings, HOME
+#   python -m benchmarks.cold_start --size 1M --page pages/3_READINGS.py --think 2
+#
+# Every run starts its own process with a fake Sheets API serving synthetic
+# rows. "prewarm" calls warmup.prewarm() as the server's startup hook would,
+# waits --think seconds (a visitor arriving on the intro page), and then runs
+# the page with streamlit's AppTest; "cold" runs the page straight away. The
+# reported time is warmup's own first-page gauge (the same figure the app
+# exports as arcrehab_time_to_first_page_seconds). Generating the synthetic
+# rows imports numpy and pandas, so their import time is not included.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["cold", "prewarm"]
+
+
+def _run_worker(mode, args):
+    store_dir = tempfile.mkdtemp(prefix="arcrehab-cold-")
+    os.environ["ARCREHAB_STORE_DIR"] = store_dir
+    os.environ["ARCREHAB_PATIENTS_FILE"] = os.path.join(store_dir, "no-patients.json")
+    sys.path.insert(0, ROOT)
+
+    from benchmarks import synthetic
+    from benchmarks.fake_sheets import FakeSheets
+    from benchmarks.run import _parse_size
+
+    rows = _parse_size(args.size)
+    fake = FakeSheets({
+        "Sheet2": synthetic.vitals_rows(rows, args.interval),
+        "Sheet4": synthetic.scores_rows(max(rows * args.interval // 300, 1)),
+    }, latency=args.latency)
+
+    import sheets_client
+    import warmup
+    from streamlit.testing.v1 import AppTest
+
+    sheets_client.use_service(fake)
+    if mode == "prewarm":
+        warmup.prewarm()
+        time.sleep(args.think)
+
+    started = time.perf_counter()
+    page = AppTest.from_file(os.path.join(ROOT, args.page), default_timeout=600)
+    page.run()
+    page_seconds = time.perf_counter() - started
+    errors = [str(element.value) for element in list(page.exception) + list(page.error)]
+
+    return {"mode": mode, "rows": rows, "page_seconds": page_seconds, "errors": errors, **warmup.status()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to the first useful page of a fresh server process.")
+    parser.add_argument("--size", default="100k", help="vitals rows in the fake sheet, e.g. 10k, 1M")
+    parser.add_argument("--page", default="pages/1_HOME.py", help="page run as the first visit")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between server start and the first visit with the warm-up")
+    parser.add_argument("--interval", type=int, default=5, help="seconds between vitals readings")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets request")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        json.dump(_run_worker(args.worker, args), sys.stdout)
+        return 0
+
+    failed = 0
+    for mode in MODES:
+        command = [sys.executable, "-m", "benchmarks.cold_start", "--worker", mode] + [
+            f"--{name}={value}" for name, value in vars(args).items() if name != "worker"
+        ]
+        done = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        if done.returncode != 0:
+            print(f"{mode:<8} failed with exit code {done.returncode}", file=sys.stderr)
+            failed += 1
+            continue
+
+        result = json.loads(done.stdout)
+        warm = "" if mode == "cold" else f"   warm-up {result['warmup_seconds'] or float('nan'):6.2f} s"
+        print(f"{mode:<8} first page after start {result['first_page_seconds']:6.2f} s   page run {result['page_seconds']:6.2f} s{warm}")
+        for error in result["errors"]:
+            print(f"  error: {error}", file=sys.stderr)
+        failed += bool(result["errors"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import re
+import threading
+import time
+
+# -------------------------
+# Local Fake of the Sheets API
+# -------------------------
+# Serves in-memory rows through the subset of the Sheets v4 client the app
+# uses: spreadsheets().values().get(...) and .batchGet(...), both returning a
+# request object with execute(). Ranges are A1 notation ("Sheet2!A1:E",
+# "Sheet2!A120:E"); like the real API, empty ranges come back without "values".
+# Install it with sheets_client.use_service(FakeSheets({...})).
+
+_RANGE = re.compile(r"^(?P<sheet>[^!]+)(?:!(?P<c0>[A-Z]+)(?P<r0>\d*)(?::(?P<c1>[A-Z]+)(?P<r1>\d*))?)?$")
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+class _Request:
+    def __init__(self, fetch, latency):
+        self._fetch = fetch
+        self._latency = latency
+
+    def execute(self, http=None, num_retries=0):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._fetch()
+
+
+class FakeSheets:
+    def __init__(self, sheets, latency=0.0):
+        # sheets: {sheet name: rows (header first)}; latency: seconds added to every request
+        self.sheets = sheets
+        self.latency = latency
+        self.requests = 0
+        self.rows_served = 0
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def append_rows(self, sheet, rows):
+        with self._lock:
+            self.sheets[sheet].extend(rows)
+
+    def _value_range(self, cell_range):
+        match = _RANGE.match(cell_range)
+        rows = self.sheets[match["sheet"]]
+        if match["c0"] is not None:
+            first_row = int(match["r0"] or 1)
+            last_row = int(match["r1"]) if match["r1"] else len(rows)
+            rows = rows[first_row - 1:last_row]
+
+            first_col = _column_index(match["c0"])
+            last_col = _column_index(match["c1"] or match["c0"])
+            if first_col > 0 or any(len(row) > last_col + 1 for row in rows[:1]):
+                rows = [row[first_col:last_col + 1] for row in rows]
+
+        with self._lock:
+            self.requests += 1
+            self.rows_served += len(rows)
+        return {"range": cell_range, "values": rows} if rows else {"range": cell_range}
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return _Request(lambda: self._value_range(range), self.latency)
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        return _Request(lambda: {"valueRanges": [self._value_range(cell_range) for cell_range in ranges]}, self.latency)
@@ -0,0 +1,383 @@
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# -------------------------
+# Concurrent Session Load Test
+# -------------------------
+# Drives N concurrent headless sessions through the data pages, in one process
+# the way one Streamlit server would hold them, against the local fake of the
+# Sheets API serving synthetic rows:
+#
+#   python -m benchmarks.load_test                          # 8 sessions, 100k readings
+#   python -m benchmarks.load_test --sessions 32 --rounds 3 --size 1M --think 0.5
+#
+# Every session is a thread that opens each page with streamlit's AppTest and
+# then works its widgets (SCENARIOS: date multiselects, the hour slider, chart
+# type and comparison toggles, ...), rerunning the page after every change.
+# Widget values come from a per-session random generator, so sessions overlap
+# on some filters and differ on others, like real caregivers.
+#
+# One session runs alone first, so the measured phase starts from a server that
+# has loaded the data once. For the concurrent phase the tool reports:
+#
+#   latency - per page and action: count and p50 / p90 / p99 / max in ms
+#             ("open" is a fresh page run, everything else a widget rerun)
+#   memory  - process RSS before and after, and the growth per session; every
+#             session's pages stay alive until the end, like open browser tabs
+#   caches  - lookups, computes and hit rate per st.cache_data/cache_resource
+#             function (counted by wrapping streamlit's CachedFunc)
+#
+# AppTest sets process-wide state around every run: a mock Runtime singleton,
+# a patched config.get_option (global.appTest), and a compile of the script.
+# Runs on several threads would undo each other's setup, so the harness sets
+# it once for the whole test (_share_app_test): every run sees the first mock
+# Runtime, like sessions of one server, global.appTest stays on, and scripts
+# are compiled one at a time (CPython 3.11's parser is not safe across threads).
+#
+# A session that raises is recorded as an error and not counted as finished;
+# per-session figures are divided by the finished sessions, and any error makes
+# the tool exit with status 1.
+#
+# Results are written as JSON to benchmarks/results/ (or --output).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_PAGES = "pages/1_HOME.py,pages/2_DATA_OVERVIEW.py,pages/3_READINGS.py,pages/4_STATS_GEN.py"
+PERCENTILES = [50, 90, 99]
+
+
+def _rss_mb():
+    # Current RSS from /proc where there is one, the process peak otherwise
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# -------------------------
+# Widget scenarios
+# -------------------------
+# (action, change) pairs per page; change(page, rng) sets widget values on the
+# AppTest and returns False when the page has no such widget (nothing to rerun).
+
+def _widget(page, kind, label):
+    for widget in getattr(page, kind):
+        if widget.label == label:
+            return widget
+    return None
+
+
+def _set(kind, label, choose):
+    def change(page, rng):
+        widget = _widget(page, kind, label)
+        if widget is None:
+            return False
+        widget.set_value(choose(widget, rng))
+        return True
+    return change
+
+
+def _one_of(widget, rng):
+    return rng.choice(list(widget.options))
+
+
+def _some_of(widget, rng):
+    options = list(widget.options)
+    return rng.sample(options, rng.randint(1, len(options))) if options else []
+
+
+def _hours(widget, rng):
+    start = rng.randint(0, 20)
+    return start, rng.randint(start + 1, 24)
+
+
+SCENARIOS = {
+    "pages/1_HOME.py": [
+        ("compare mode", _set("selectbox", "Compare with:", _one_of)),
+        ("chart type", _set("selectbox", "Select chart type", _one_of)),
+        ("weight", _set("number_input", "Weight (kg)", lambda widget, rng: float(rng.randint(40, 120)))),
+    ],
+    "pages/2_DATA_OVERVIEW.py": [
+        ("stats dates", _set("multiselect", "Select date(s) to view stats table:", _some_of)),
+        ("chart dates", _set("multiselect", "Select Dates", _some_of)),
+        ("export format", _set("selectbox", "Format", _one_of)),
+    ],
+    "pages/3_READINGS.py": [
+        ("dates", _set("multiselect", "Select Date(s):", _some_of)),
+        ("hours", _set("slider", "Select Time Range (Hours):", _hours)),
+        ("downsampling", _set("selectbox", "Downsampling", _one_of)),
+        ("score chart type", _set("radio", "Select Chart Type", _one_of)),
+    ],
+    "pages/4_STATS_GEN.py": [
+        ("rerun", lambda page, rng: True),
+    ],
+}
+
+
+# -------------------------
+# Sessions
+# -------------------------
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = []
+        self.finished = 0
+
+    def timed(self, page_path, action, page):
+        started = time.perf_counter()
+        page.run()
+        seconds = time.perf_counter() - started
+        errors = [str(element.value) for element in list(page.exception) + list(page.error)]
+        with self.lock:
+            self.latencies[(page_path, action)].append(seconds)
+            self.errors.extend(f"{page_path} {action}: {error}" for error in errors)
+
+
+def _session(number, pages, args, recorder, held):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed * 1000 + number)
+    try:
+        for _ in range(args.rounds):
+            for page_path in pages:
+                page = AppTest.from_file(os.path.join(ROOT, page_path), default_timeout=args.timeout)
+                recorder.timed(page_path, "open", page)
+                for action, change in SCENARIOS.get(page_path, []):
+                    time.sleep(args.think)
+                    if change(page, rng):
+                        recorder.timed(page_path, action, page)
+                held.append(page)
+    except Exception as error:
+        # A session that dies must fail the run, not vanish from the report
+        with recorder.lock:
+            recorder.errors.append(f"session {number}: {type(error).__name__}: {error}")
+        return
+    with recorder.lock:
+        recorder.finished += 1
+
+
+def _run_sessions(count, first, pages, args, recorder, held):
+    threads = [
+        threading.Thread(target=_session, args=(first + number, pages, args, recorder, held), name=f"session-{first + number}")
+        for number in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _share_app_test():
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+
+    shared = {"runtime": None}
+    lock = threading.Lock()
+
+    def instance(cls):
+        with lock:
+            if shared["runtime"] is None:
+                shared["runtime"] = cls._instance
+        if shared["runtime"] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return shared["runtime"]
+
+    def exists(cls):
+        return shared["runtime"] is not None or cls._instance is not None
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+    get_bytecode, compiling = ScriptCache.get_bytecode, threading.Lock()
+
+    def compile_one_at_a_time(self, script_path):
+        with compiling:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = compile_one_at_a_time
+
+
+# -------------------------
+# Cache counters
+# -------------------------
+
+def _count_caches(counts, lock):
+    # Counts lookups and computes per cached function; a lookup that is not computed was a hit
+    from streamlit.runtime.caching.cache_utils import CachedFunc
+
+    lookup, store = CachedFunc._get_or_create_cached_value, CachedFunc._store_computed_value
+
+    def name(cached):
+        return f"{cached._info.func.__module__}.{cached._info.func.__qualname__}"
+
+    def counted_lookup(self, *args, **kwargs):
+        with lock:
+            counts[name(self)]["lookups"] += 1
+        return lookup(self, *args, **kwargs)
+
+    def counted_store(self, *args, **kwargs):
+        with lock:
+            counts[name(self)]["computes"] += 1
+        return store(self, *args, **kwargs)
+
+    CachedFunc._get_or_create_cached_value = counted_lookup
+    CachedFunc._store_computed_value = counted_store
+
+
+def _cache_report(counts):
+    report = {}
+    for name in sorted(counts):
+        lookups, computes = counts[name]["lookups"], counts[name]["computes"]
+        report[name] = {"lookups": lookups, "computes": computes, "hit_rate": 1 - computes / lookups if lookups else None}
+    return report
+
+
+def _latency_report(latencies):
+    import numpy as np
+
+    report = {}
+    for (page_path, action), runs in sorted(latencies.items()):
+        ms = np.array(runs) * 1000
+        entry = {"count": len(runs), "max_ms": round(float(ms.max()), 1)}
+        entry.update({f"p{q}_ms": round(float(np.percentile(ms, q)), 1) for q in PERCENTILES})
+        report[f"{os.path.basename(page_path)} {action}"] = entry
+    return report
+
+
+def _print_report(report):
+    print(
+        f"\n{report['sessions']} concurrent sessions ({report['finished_sessions']} finished), "
+        f"{report['rounds']} round(s), {report['rows']:,} readings", file=sys.stderr,
+    )
+    print(f"  {'page / action':<36} {'runs':>5} " + " ".join(f"{f'p{q}':>8}" for q in PERCENTILES) + f" {'max':>8}  (ms)", file=sys.stderr)
+    for name, entry in report["latency"].items():
+        percentiles = " ".join(f"{entry[f'p{q}_ms']:8.1f}" for q in PERCENTILES)
+        print(f"  {name:<36} {entry['count']:5d} {percentiles} {entry['max_ms']:8.1f}", file=sys.stderr)
+
+    memory = report["memory"]
+    growth = f"{memory['growth_per_session_mb']:.2f} MB" if memory["growth_per_session_mb"] is not None else "-"
+    print(
+        f"\n  RSS {memory['rss_before_mb']:.1f} MB -> {memory['rss_after_mb']:.1f} MB, "
+        f"{growth} per finished session", file=sys.stderr,
+    )
+    print(f"\n  {'cached function':<44} {'lookups':>8} {'computes':>9} {'hit rate':>9}", file=sys.stderr)
+    for name, entry in report["caches"].items():
+        hit_rate = f"{entry['hit_rate']:9.1%}" if entry["hit_rate"] is not None else f"{'-':>9}"
+        print(f"  {name:<44} {entry['lookups']:8d} {entry['computes']:9d} {hit_rate}", file=sys.stderr)
+    if report["errors"]:
+        print(f"\n  {len(report['errors'])} error(s), first: {report['errors'][0]}", file=sys.stderr)
+
+
+def _load_test(args):
+    store_dir = tempfile.mkdtemp(prefix="arcrehab-load-")
+    os.environ["ARCREHAB_STORE_DIR"] = store_dir
+    os.environ["ARCREHAB_PATIENTS_FILE"] = os.path.join(store_dir, "no-patients.json")
+    sys.path.insert(0, ROOT)
+
+    import streamlit.logger
+
+    streamlit.logger.set_log_level("error")
+
+    import sheets_client
+    from benchmarks import synthetic
+    from benchmarks.fake_sheets import FakeSheets
+    from benchmarks.run import _parse_size
+
+    rows = _parse_size(args.size)
+    fake = FakeSheets({
+        "Sheet2": synthetic.vitals_rows(rows, args.interval, seed=args.seed),
+        "Sheet4": synthetic.scores_rows(max(rows * args.interval // args.score_interval, 1), args.score_interval, seed=args.seed),
+    }, latency=args.latency)
+    sheets_client.use_service(fake)
+    _share_app_test()
+    pages = args.pages.split(",")
+
+    # One session alone: loads the data and fills the shared caches
+    warm, held = _Recorder(), []
+    _run_sessions(1, 0, pages, args, warm, held)
+
+    counts, lock = defaultdict(lambda: {"lookups": 0, "computes": 0}), threading.Lock()
+    _count_caches(counts, lock)
+    recorder = _Recorder()
+    gc.collect()
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    _run_sessions(args.sessions, 1, pages, args, recorder, held)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    rss_after = _rss_mb()
+
+    return {
+        "sessions": args.sessions,
+        "finished_sessions": recorder.finished,
+        "rounds": args.rounds,
+        "rows": rows,
+        "seconds": round(seconds, 2),
+        "first_session": _latency_report(warm.latencies),
+        "latency": _latency_report(recorder.latencies),
+        "memory": {
+            "rss_before_mb": round(rss_before, 1),
+            "rss_after_mb": round(rss_after, 1),
+            "growth_per_session_mb": round((rss_after - rss_before) / recorder.finished, 2) if recorder.finished else None,
+        },
+        "caches": _cache_report(counts),
+        "sheet_requests": fake.requests,
+        "errors": warm.errors + recorder.errors,
+    }
+
+
+def main():
+    from benchmarks.run import _environment
+
+    parser = argparse.ArgumentParser(description="Load-test the data pages with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=2, help="passes of every session through the pages")
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="comma-separated page scripts, relative to the repo")
+    parser.add_argument("--size", default="100k", help="vitals rows in the fake sheet, e.g. 10k, 1M")
+    parser.add_argument("--interval", type=int, default=5, help="seconds between vitals readings")
+    parser.add_argument("--score-interval", type=int, default=300, help="seconds between game scores")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets request")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a session waits before each widget change")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds one page run may take")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args()
+
+    report = _load_test(args)
+    _print_report(report)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "environment": _environment(),
+            "settings": {name: value for name, value in vars(args).items() if name != "output"},
+            "results": report,
+        }, f, indent=2)
+    print(f"\nResults written to {output}", file=sys.stderr)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
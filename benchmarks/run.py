@@ -0,0 +1,241 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# -------------------------
+# Benchmark Harness
+# -------------------------
+# Times the data path of the dashboard against synthetic sheets served by the
+# local fake of the Sheets API, one history size at a time:
+#
+#   python -m benchmarks.run                          # 10k, 1M and 10M readings
+#   python -m benchmarks.run --sizes 10k,100k --repeat 5
+#   python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+#
+# Every size runs in its own process (fresh caches, fresh temporary store) so
+# the reported peak RSS belongs to that size alone. Results are written as JSON
+# to benchmarks/results/ (or --output); --compare prints the change per step
+# against an earlier run and flags slowdowns above --threshold.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_SIZES = "10k,1M,10M"
+
+
+def _parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _Steps:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, fn, repeat=None):
+        # Best of `repeat` runs; the peak RSS is the process peak once the step finished
+        runs = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            value = fn()
+            runs.append(time.perf_counter() - started)
+        self.results[name] = {"seconds": min(runs), "runs": runs, "peak_rss_mb": round(_peak_rss_mb(), 1)}
+        print(f"  {name:<28} {min(runs) * 1000:10.1f} ms   peak {_peak_rss_mb():8.1f} MB", file=sys.stderr)
+        return value
+
+
+def _bench_size(rows, args):
+    store_dir = tempfile.mkdtemp(prefix="arcrehab-bench-")
+    os.environ["ARCREHAB_STORE_DIR"] = store_dir
+    os.environ["ARCREHAB_PATIENTS_FILE"] = os.path.join(store_dir, "no-patients.json")
+    sys.path.insert(0, ROOT)
+
+    import plotly.express as px
+    import streamlit as st
+    import streamlit.logger
+
+    streamlit.logger.set_log_level("error")  # caches used outside `streamlit run` warn on every call
+
+    import analytics
+    import query
+    import sheets_client
+    from alerts import breach_mask, evaluate_rules
+    from benchmarks import synthetic
+    from benchmarks.fake_sheets import FakeSheets
+    from daily_stats import daily_summary, get_daily_rollup, summarize_days
+    from downsample import downsample_lines
+    from pyramid import get_pyramid, history_window
+    from schema import date_labels, memory_footprint
+    from utils import VITALS_DATASET, VITALS_SHEET_NAME, load_data_from_gsheets, refresh_vitals
+    from utils2 import SCORE_DATASET, SCORE_SHEET_NAME, load_score_data
+
+    score_rows = max(rows * args.interval // args.score_interval, 1)
+    steps = _Steps(args.repeat)
+
+    vitals, scores = steps.run("generate_rows", lambda: (
+        synthetic.vitals_rows(rows, args.interval, abnormal=args.abnormal, seed=args.seed),
+        synthetic.scores_rows(score_rows, args.score_interval, seed=args.seed),
+    ), repeat=1)
+    fake = FakeSheets({VITALS_SHEET_NAME: vitals, SCORE_SHEET_NAME: scores}, latency=args.latency)
+    sheets_client.use_service(fake)
+
+    # Load + parse: first load fetches and parses everything, later ones hit the caches
+    steps.run("load_cold", lambda: (load_data_from_gsheets(), load_score_data()), repeat=1)
+    df, score_df = steps.run("load_cached", lambda: (load_data_from_gsheets(), load_score_data()))
+
+    def restart():
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        return load_data_from_gsheets(), load_score_data()
+
+    steps.run("load_restart_from_store", restart, repeat=1)
+
+    appended = max(rows // 1000, 100)
+    fake.append_rows(VITALS_SHEET_NAME, synthetic.vitals_rows(appended, args.interval, abnormal=args.abnormal, seed=args.seed, first=rows))
+    steps.run("sync_delta", lambda: refresh_vitals(), repeat=1)
+    df = load_data_from_gsheets()
+
+    # Per-page computations on the loaded frames
+    steps.run("daily_summary_vitals", lambda: daily_summary(get_daily_rollup(VITALS_DATASET)))
+    steps.run("daily_summary_scores", lambda: daily_summary(get_daily_rollup(SCORE_DATASET)))
+    rollup = get_daily_rollup(VITALS_DATASET)
+    steps.run("summarize_all_days", lambda: summarize_days(rollup, rollup["stats"]["Date"].unique()))
+
+    dates = query.available_dates(df)
+    steps.run("filter_one_day_hours", lambda: query.select_rows(df, dates[-1:], (8 * 3600, 12 * 3600)))
+    selected = steps.run("filter_all_days", lambda: query.select_rows(df, dates, (0, 25 * 3600)))
+
+    steps.run("alert_scan_full", lambda: evaluate_rules(df, {}), repeat=1)
+    keep = steps.run("breach_mask", lambda: breach_mask(selected, "Heart Rate"))
+    plot_df, _ = steps.run("downsample_lttb", lambda: downsample_lines(selected, "Timestamp", "Heart Rate", selected["DateKey"], "LTTB", keep_mask=keep))
+    steps.run("readings_chart_series", lambda: analytics.chart_series(analytics.aligned_readings(df, dates, (0, 25 * 3600)), "Heart Rate", "LTTB"))
+    steps.run("history_window_all", lambda: history_window(get_pyramid(VITALS_DATASET), df, "Heart Rate", df["Timestamp"].iat[0], df["Timestamp"].iat[-1]))
+
+    def figure():
+        fig = px.line(plot_df, x="Timestamp", y="Heart Rate", color=date_labels(plot_df))
+        return fig.to_json()
+
+    steps.run("figure_build_json", figure)
+
+    vitals_bytes, vitals_row_bytes = memory_footprint(df)
+    scores_bytes, _ = memory_footprint(score_df)
+    return {
+        "rows": rows,
+        "score_rows": score_rows,
+        "history_days": round(rows * args.interval / 86_400, 1),
+        "frame_bytes": {"vitals": vitals_bytes, "scores": scores_bytes, "vitals_per_row": round(vitals_row_bytes, 1)},
+        "sheet_requests": fake.requests,
+        "steps": steps.results,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "pyarrow": pyarrow.__version__,
+        "commit": _git_commit(),
+    }
+
+
+def _compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {entry["rows"]: entry for entry in json.load(f)["results"]}
+
+    slower = 0
+    for entry in results:
+        before = baseline.get(entry["rows"])
+        if before is None:
+            continue
+        print(f"\n{entry['rows']:,} rows vs {baseline_path}")
+        for name, step in entry["steps"].items():
+            if name not in before["steps"] or before["steps"][name]["seconds"] <= 0:
+                continue
+            ratio = step["seconds"] / before["steps"][name]["seconds"]
+            flag = "  <-- slower" if ratio > threshold else ""
+            slower += bool(flag)
+            print(f"  {name:<28} {ratio:6.2f}x{flag}")
+        print(f"  {'peak_rss_mb':<28} {entry['peak_rss_mb'] / before['peak_rss_mb']:6.2f}x")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data path on synthetic sheets.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="vitals row counts, e.g. 10k,1M,10M")
+    parser.add_argument("--interval", type=int, default=5, help="seconds between vitals readings")
+    parser.add_argument("--score-interval", type=int, default=300, help="seconds between game scores")
+    parser.add_argument("--abnormal", type=float, default=0.02, help="share of readings breaching an alert threshold")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake Sheets request")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per warm step (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio flagged by --compare")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        json.dump(_bench_size(args.worker, args), sys.stdout)
+        return 0
+
+    results = []
+    for rows in map(_parse_size, args.sizes.split(",")):
+        print(f"{rows:,} readings", file=sys.stderr)
+        command = [sys.executable, "-m", "benchmarks.run", "--worker", str(rows)] + [
+            f"--{name.replace('_', '-')}={value}"
+            for name, value in vars(args).items()
+            if name in ("interval", "score_interval", "abnormal", "latency", "repeat", "seed")
+        ]
+        done = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        if done.returncode != 0:
+            print(f"  failed with exit code {done.returncode}", file=sys.stderr)
+            continue
+        results.append(json.loads(done.stdout))
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "settings": {name: value for name, value in vars(args).items() if name not in ("worker", "output", "compare")},
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}", file=sys.stderr)
+
+    if args.compare:
+        _compare(results, args.compare, args.threshold)
+    return 0 if len(results) == len(args.sizes.split(",")) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
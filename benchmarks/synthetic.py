@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# Synthetic Sheet Rows
+# -------------------------
+# Rows shaped like the ones the device and the game write: Sheet2 holds
+# Date, Time, Temperature, Heart Rate, SpO2 and Sheet4 holds Date, Time, Score,
+# all as cell text in the sheet's "%d-%m-%Y" / "%H:%M:%S" format. The rate is
+# the reading interval in seconds and the history length follows from the row
+# count. Cell text is built from small lookup tables, so even 10M rows are
+# generated in seconds and share their string objects.
+
+VITALS_HEADER = ["Date", "Time", "Temperature", "Heart Rate", "SpO2"]
+SCORES_HEADER = ["Date", "Time", "Score"]
+START = pd.Timestamp("2024-01-01 00:00:00")
+
+_TIMES = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86_400)], dtype=object)
+
+
+def _epoch_seconds(n, interval, start, first=0):
+    return start.value // 1_000_000_000 + (first + np.arange(n, dtype=np.int64)) * interval
+
+
+def _date_time_text(seconds):
+    days, time_of_day = np.divmod(seconds, 86_400)
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    day_text = pd.to_datetime(unique_days, unit="D").strftime("%d-%m-%Y").to_numpy(dtype=object)
+    return day_text[day_index], _TIMES[time_of_day]
+
+
+def _cell_text(values, decimals):
+    scaled = np.round(values * 10 ** decimals).astype(np.int64)
+    unique, inverse = np.unique(scaled, return_inverse=True)
+    table = np.array([f"{value / 10 ** decimals:.{decimals}f}" for value in unique], dtype=object)
+    return table[inverse]
+
+
+def vitals_rows(n, interval=5, start=START, abnormal=0.02, seed=0, first=0):
+    # Header plus `n` readings `interval` seconds apart; about `abnormal` of them breach an alert threshold.
+    # `first` offsets the reading numbers, so rows appended later continue the same history.
+    rng = np.random.default_rng(seed + first)
+    temperature = rng.normal(98.4, 0.4, n)
+    heart_rate = rng.normal(78, 6, n)
+    spo2 = np.minimum(rng.normal(97.5, 0.8, n), 100)
+
+    kind = np.where(rng.random(n) < abnormal, rng.integers(1, 4, n), 0)
+    temperature = np.where(kind == 1, rng.uniform(99.6, 102, n), temperature)
+    heart_rate = np.where(kind == 2, rng.uniform(101, 130, n), heart_rate)
+    spo2 = np.where(kind == 3, rng.uniform(85, 94, n), spo2)
+
+    dates, times = _date_time_text(_epoch_seconds(n, interval, start, first))
+    columns = [dates, times, _cell_text(temperature, 1), _cell_text(heart_rate, 0), _cell_text(spo2, 0)]
+    return ([VITALS_HEADER] if first == 0 else []) + np.column_stack(columns).tolist()
+
+
+def scores_rows(n, interval=300, start=START, seed=0, first=0):
+    # Header plus `n` game scores `interval` seconds apart
+    rng = np.random.default_rng(seed + 1 + first)
+    dates, times = _date_time_text(_epoch_seconds(n, interval, start, first))
+    columns = [dates, times, _cell_text(rng.integers(0, 201, n).astype(np.float64), 0)]
+    return ([SCORES_HEADER] if first == 0 else []) + np.column_stack(columns).tolist()
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sheet_sync import add_listener, stored_frame
+
+# -------------------------
+# Daily Aggregate Table
+# -------------------------
+# Per dataset we keep one rollup with two tables and the latest row:
+#
+#   stats  - one row per (Date, Metric): count, sum, sumsq, min, max
+#   sketch - value counts per (Date, Metric, Value), values rounded to
+#            SKETCH_DECIMALS; a mergeable sketch for medians and quantiles
+#   latest - the most recent row (Timestamp and metrics), for overviews
+#
+# Both tables only hold sums, minima, maxima and counts, so rollups for new
+# rows are merged into the existing ones instead of rescanning the raw data;
+# only the dates the new rows touch are regrouped and spliced back in.
+
+SKETCH_DECIMALS = 2
+STAT_COLUMNS = ["count", "sum", "sumsq", "min", "max"]
+
+_TRACKED = {}
+
+
+def _empty_rollup():
+    return {
+        "stats": pd.DataFrame(columns=["Date", "Metric"] + STAT_COLUMNS),
+        "sketch": pd.DataFrame(columns=["Date", "Metric", "Value", "Count"]),
+        "latest": None,
+    }
+
+
+def build_rollup(frame, metrics):
+    if frame.empty:
+        return _empty_rollup()
+
+    long = frame[metrics].assign(Date=frame["Timestamp"].dt.normalize()).melt(
+        id_vars="Date", var_name="Metric", value_name="Value"
+    ).dropna(subset=["Value"])
+    # Accumulate in float64 even though the frames store float32 vitals
+    long["Value"] = long["Value"].astype("float64")
+    long["Square"] = long["Value"] ** 2
+
+    grouped = long.groupby(["Date", "Metric"], sort=True)
+    stats = grouped["Value"].agg(["count", "sum", "min", "max"])
+    stats.insert(2, "sumsq", grouped["Square"].sum())
+    stats = stats.reset_index()
+
+    sketch = (
+        long.assign(Value=long["Value"].round(SKETCH_DECIMALS))
+        .groupby(["Date", "Metric", "Value"], sort=True).size()
+        .rename("Count").reset_index()
+    )
+    latest = frame.iloc[frame["Timestamp"].to_numpy().argmax()][["Timestamp"] + metrics]
+    return {"stats": stats, "sketch": sketch, "latest": latest}
+
+
+STAT_MERGE = {"count": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max"}
+SKETCH_MERGE = {"Count": "sum"}
+
+
+def _splice(table, update, keys, merge):
+    # Regroups the rows of the dates in `update` with it; rows of other dates are kept as they are
+    touched = table["Date"].isin(update["Date"].unique()).to_numpy()
+    merged = pd.concat([table[touched], update], ignore_index=True).groupby(keys, sort=True).agg(merge).reset_index()
+    kept = table[~touched]
+    spliced = pd.concat([kept, merged], ignore_index=True)
+    # New rows normally touch the last dates; only re-sort when they reach back
+    if not kept.empty and merged["Date"].iat[0] < kept["Date"].iat[-1]:
+        spliced = spliced.sort_values(keys, kind="stable", ignore_index=True)
+    return spliced
+
+
+def merge_rollups(left, right):
+    if left["stats"].empty:
+        return right
+    if right["stats"].empty:
+        return left
+
+    stats = _splice(left["stats"], right["stats"], ["Date", "Metric"], STAT_MERGE)
+    sketch = _splice(left["sketch"], right["sketch"], ["Date", "Metric", "Value"], SKETCH_MERGE)
+
+    latest = left["latest"]
+    if latest is None or (right["latest"] is not None and right["latest"]["Timestamp"] >= latest["Timestamp"]):
+        latest = right["latest"]
+    return {"stats": stats, "sketch": sketch, "latest": latest}
+
+
+def sketch_median(sketch, keys):
+    # Exact median (at sketch resolution) per group of `keys` from value counts
+    if sketch.empty:
+        return pd.Series(dtype="float64")
+
+    ordered = sketch.sort_values(keys + ["Value"])
+    grouped = ordered.groupby(keys, sort=False)["Count"]
+    cumulative = grouped.cumsum()
+    total = grouped.transform("sum")
+
+    # Middle ranks (0-based); both are equal for an odd count
+    low = ordered[cumulative > (total - 1) // 2].groupby(keys)["Value"].first()
+    high = ordered[cumulative > total // 2].groupby(keys)["Value"].first()
+    return (low + high) / 2
+
+
+def daily_summary(rollup):
+    # One row per (Date, Metric) with count, sum, mean, median, std, max and min
+    stats = rollup["stats"].set_index(["Date", "Metric"])
+    if stats.empty:
+        # Typed like a filled summary, so callers can still use the .dt accessor on Date
+        return pd.DataFrame(columns=["Date", "Metric", "count", "sum", "mean", "median", "std", "max", "min"]).astype({"Date": "datetime64[ns]"})
+
+    count = stats["count"].astype("float64")
+    summary = pd.DataFrame({
+        "count": stats["count"].astype("int64"),
+        "sum": stats["sum"],
+        "mean": stats["sum"] / count,
+        "median": sketch_median(rollup["sketch"], ["Date", "Metric"]),
+        "std": np.sqrt(((stats["sumsq"] - stats["sum"] ** 2 / count) / (count - 1)).clip(lower=0)),
+        "max": stats["max"],
+        "min": stats["min"],
+    }, index=stats.index)
+    return summary.reset_index()
+
+
+def summarize_days(rollup, dates):
+    # Exact multi-day summary per Metric: weighted mean, merged-sketch median, global min/max
+    dates = pd.DatetimeIndex(dates)
+    stats = rollup["stats"]
+    stats = stats[stats["Date"].isin(dates)]
+    if stats.empty:
+        return pd.DataFrame(columns=["Metric", "count", "sum", "mean", "median", "std", "max", "min"])
+
+    totals = stats.groupby("Metric").agg(
+        count=("count", "sum"),
+        sum=("sum", "sum"),
+        sumsq=("sumsq", "sum"),
+        min=("min", "min"),
+        max=("max", "max"),
+    )
+    sketch = rollup["sketch"]
+    sketch = sketch[sketch["Date"].isin(dates)].groupby(["Metric", "Value"])["Count"].sum().reset_index()
+
+    count = totals["count"].astype("float64")
+    summary = pd.DataFrame({
+        "count": totals["count"].astype("int64"),
+        "sum": totals["sum"],
+        "mean": totals["sum"] / count,
+        "median": sketch_median(sketch, ["Metric"]),
+        "std": np.sqrt(((totals["sumsq"] - totals["sum"] ** 2 / count) / (count - 1)).clip(lower=0)),
+        "max": totals["max"],
+        "min": totals["min"],
+    }, index=totals.index)
+    return summary.reset_index()
+
+
+# -------------------------
+# Rollups maintained from the sheet sync
+# -------------------------
+
+@st.cache_resource(show_spinner=False)
+def _rollups():
+    return {}
+
+
+def track_daily_rollup(dataset, metrics):
+    _TRACKED[dataset] = metrics
+
+    def on_change(frame, new_rows):
+        rollups = _rollups()
+        if new_rows is None or dataset not in rollups:
+            rollups[dataset] = build_rollup(frame, metrics)
+        else:
+            rollups[dataset] = merge_rollups(rollups[dataset], build_rollup(new_rows, metrics))
+
+    add_listener(dataset, "daily_stats", on_change)
+
+
+def get_daily_rollup(dataset):
+    rollups = _rollups()
+    if dataset not in rollups:
+        # Restoring the frame notifies the listener above, which may already build the rollup
+        frame = stored_frame(dataset)
+        if dataset not in rollups:
+            rollups[dataset] = build_rollup(frame, _TRACKED[dataset])
+    return rollups[dataset]
@@ -0,0 +1,93 @@
+import numpy as np
+
+# -------------------------
+# Chart Downsampling
+# -------------------------
+# Reduces the plotted lines to roughly one point per horizontal pixel before
+# they are handed to Plotly. The pixel budget is shared by all lines of a chart,
+# so the payload stays about the same however many lines (e.g. days) are
+# selected. Points flagged in keep_mask (e.g. abnormal readings) are always
+# kept so spikes stay visible.
+
+CHART_WIDTH_PX = 1400
+MIN_POINTS_PER_LINE = 16  # floor per line when the budget is split across many lines
+DOWNSAMPLE_METHODS = ["LTTB", "Min/Max", "Off"]
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: first and last point plus one point per bucket
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+
+    return out
+
+
+def minmax_indices(y, n_out):
+    # Minimum and maximum of each bucket, two points per bucket
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+
+    out = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            out.append(start + int(np.argmin(bucket)))
+            out.append(start + int(np.argmax(bucket)))
+
+    return np.unique(out)
+
+
+def downsample_lines(df, x_col, y_col, by, method, n_out=CHART_WIDTH_PX, keep_mask=None):
+    # Downsamples every line (group of `by`) separately to its share of n_out points;
+    # returns the reduced frame and the dropped count
+    if method == "Off" or df.empty:
+        return df, 0
+
+    x = df[x_col].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    y = df[y_col].to_numpy()
+
+    lines = df.groupby(by, sort=False).indices
+    per_line = max(n_out // len(lines), MIN_POINTS_PER_LINE)
+
+    selected = []
+    for positions in lines.values():
+        if method == "LTTB":
+            picked = lttb_indices(x[positions], y[positions], per_line)
+        else:
+            picked = minmax_indices(y[positions], per_line)
+        selected.append(positions[picked])
+
+    if keep_mask is not None:
+        selected.append(np.flatnonzero(np.asarray(keep_mask)))
+
+    keep = np.unique(np.concatenate(selected)) if selected else np.arange(0)
+    return df.iloc[keep], len(df) - len(keep)
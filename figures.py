@@ -0,0 +1,223 @@
+import json
+import os
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from perf import span
+from pyramid import RAW_LEVEL
+from schema import date_labels
+
+# -------------------------
+# Figure Cache
+# -------------------------
+# The page charts are built by the functions below from analytics.py results.
+# figure(key, build, *data, **params) returns build(*data, **params) from a
+# cache of its serialised JSON, keyed like analytics.memoized: `key` identifies
+# the data (dataset, version, filters) and the parameters (chart type, ...)
+# complete it. A rerun caused by any other widget only parses the JSON back
+# instead of rebuilding every trace.
+#
+# Line and scatter traces render as WebGL (Scattergl) once a figure holds more
+# than WEBGL_POINTS points, so long histories pan and zoom smoothly; set
+# ARCREHAB_RENDER_MODE=svg or =webgl to force one mode.
+#
+# plotly.express is imported by the builders that use it, so a page whose
+# figures all come from the cache only pays for plotly.graph_objects.
+
+FIGURE_ENTRIES = 32
+WEBGL_POINTS = 1000
+RENDER_MODE = os.environ.get("ARCREHAB_RENDER_MODE", "auto")
+
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_ENTRIES)
+def _figure_json(name, key, params, _build, _data):
+    return _build(*_data, **dict(params)).to_json()
+
+
+def figure(key, build, *data, **params):
+    # `key` must change whenever `data` does, e.g. (dataset, dataset_version(dataset), filters)
+    with span("chart.figure", chart=build.__name__) as s:
+        text = _figure_json(f"{build.__module__}.{build.__qualname__}", key, tuple(sorted(params.items())), build, data)
+        s.set(bytes=len(text))
+        # The JSON was written from a built figure, so plotly's validation is skipped on the way back
+        return go.Figure(json.loads(text), _validate=False)
+
+
+def render_mode(points):
+    if RENDER_MODE in ("svg", "webgl"):
+        return RENDER_MODE
+    return "webgl" if points > WEBGL_POINTS else "svg"
+
+
+def _scatter(points):
+    return go.Scattergl if render_mode(points) == "webgl" else go.Scatter
+
+
+# -------------------------
+# Charts
+# -------------------------
+
+def calories_chart(calories, chart_type):
+    # HOME: score and calories per score row, as lines or bars
+    fig = go.Figure()
+    x_axis = calories["Date"]
+    if chart_type == "Line":
+        scatter = _scatter(2 * len(calories))
+        fig.add_trace(scatter(x=x_axis, y=calories["Score"], mode="lines+markers", name="Score", line=dict(color="royalblue")))
+        fig.add_trace(scatter(x=x_axis, y=calories["Calories Burned"], mode="lines+markers", name="Calories Burned (kcal)", line=dict(color="tomato")))
+    else:
+        fig.add_trace(go.Bar(x=x_axis, y=calories["Score"], name="Score", marker_color="royalblue"))
+        fig.add_trace(go.Bar(x=x_axis, y=calories["Calories Burned"], name="Calories Burned (kcal)", marker_color="tomato"))
+
+    fig.update_layout(
+        title="Score and Calories Burned Over Time",
+        xaxis_title="Date",
+        yaxis_title="Value",
+        legend_title="Metric",
+        template="plotly_white"
+    )
+    return fig
+
+
+def readings_chart(plot_df, trend, metric, unit, y_range, overlays):
+    # READINGS: one line per day on a shared time axis, plus the chosen trend overlays
+    # (columns of analytics.trend_overlay) in each day's colour
+    overlay_columns = {
+        overlay: ["Baseline", "Baseline low", "Baseline high"] if overlay == "Baseline" else [overlay]
+        for overlay in overlays
+    }
+    import plotly.express as px
+
+    points = len(plot_df) * (1 + sum(len(columns) for columns in overlay_columns.values()))
+    fig = px.line(
+        plot_df,
+        x='Timestamp',
+        y=metric,
+        color=date_labels(plot_df),
+        line_shape='linear',
+        markers=False,
+        render_mode=render_mode(points),
+    )
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title=f"{metric} ({unit})",
+        yaxis_range=y_range,
+        legend_title="Date",
+        legend=dict(orientation="h", y=-0.3),
+        xaxis=dict(
+            tickformat="%H:%M:%S",
+            dtick=13000,  # setting the time interval
+            tickangle=90
+        )
+    )
+
+    # Overlays toggle with their day's line in the legend
+    scatter = _scatter(points)
+    trend_days = date_labels(trend)
+    for day_trace in list(fig.data):
+        day = trend[trend_days == day_trace.name]
+        for overlay, columns in overlay_columns.items():
+            for column in columns:
+                fig.add_trace(scatter(
+                    x=day["Timestamp"], y=day[column], mode="lines", name=f"{day_trace.name} {column}",
+                    legendgroup=day_trace.legendgroup, showlegend=False, hoverinfo="skip" if column != overlay else None,
+                    line=dict(color=day_trace.line.color, width=1, dash="dot" if column != overlay else "dash"),
+                ))
+    return fig
+
+
+def score_chart(table, chart_type):
+    # READINGS: total, average, min and max score per date (analytics.score_table rows)
+    if chart_type == "Grouped Bar Chart":
+        fig = go.Figure(data=[
+            go.Bar(name="Total Score", x=table["Date"], y=table["Total Score"], marker_color="dodgerblue"),
+            go.Bar(name="Average Score", x=table["Date"], y=table["Average Score"], marker_color="orange"),
+            go.Bar(name="Min Score", x=table["Date"], y=table["Min Score"], marker_color="green"),
+            go.Bar(name="Max Score", x=table["Date"], y=table["Max Score"], marker_color="red")
+        ])
+
+        fig.update_layout(
+            barmode="group",
+            title="Total, Average, Min & Max Scores per Date",
+            xaxis_title="Date",
+            yaxis_title="Score",
+            legend_title="Metrics",
+            legend=dict(orientation="h", y=1.1)
+        )
+        return fig
+
+    scatter = _scatter(4 * len(table))
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=table["Date"], y=table["Total Score"],
+        mode='lines+markers', name='Total Score', line=dict(color='dodgerblue', width=3)
+    ))
+    fig.add_trace(scatter(
+        x=table["Date"], y=table["Average Score"],
+        mode='lines+markers', name='Average Score', line=dict(color='orange', width=3)
+    ))
+    fig.add_trace(scatter(
+        x=table["Date"], y=table["Min Score"],
+        mode='lines+markers', name='Min Score', line=dict(color='green', dash='dot', width=2)
+    ))
+    fig.add_trace(scatter(
+        x=table["Date"], y=table["Max Score"],
+        mode='lines+markers', name='Max Score', line=dict(color='red', dash='dash', width=2)
+    ))
+
+    fig.update_layout(
+        title="Score Trends Over Selected Dates",
+        xaxis_title="Date",
+        yaxis_title="Score",
+        legend_title="Metrics",
+        margin=dict(t=60),
+        hovermode="x unified"
+    )
+    return fig
+
+
+def stats_bar_chart(combined_stats):
+    # STATS_GEN: analytics.daily_stats_long rows grouped by statistic
+    import plotly.express as px
+
+    fig = px.bar(combined_stats, x='Date', y='Value', color='Stat', barmode='group')
+    fig.update_layout(legend_title="Stat", legend=dict(orientation="h", y=-0.3))
+    return fig
+
+
+def stats_line_chart(combined_stats):
+    import plotly.express as px
+
+    fig = px.line(
+        combined_stats, x='Date', y='Value', color='Stat', line_dash='Metric', markers=True,
+        render_mode=render_mode(len(combined_stats)),
+    )
+    fig.update_layout(legend_title="Stat", legend=dict(orientation="h", y=-0.3))
+    return fig
+
+
+def history_chart(series, level, metric, unit, y_range):
+    # HISTORY: pyramid.history_window rows; rollup levels get their min-max range as a band around the mean
+    fig = go.Figure()
+    scatter = _scatter(3 * len(series))
+    if level != RAW_LEVEL:
+        fig.add_trace(scatter(x=series["Timestamp"], y=series["Max"], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"))
+        fig.add_trace(scatter(
+            x=series["Timestamp"], y=series["Min"], mode="lines", line=dict(width=0), fill="tonexty",
+            fillcolor="rgba(65,105,225,0.2)", name=f"Min-max per {level}",
+        ))
+    fig.add_trace(scatter(
+        x=series["Timestamp"], y=series["Mean"], mode="lines", line=dict(color="royalblue", width=1.5),
+        name=metric if level == RAW_LEVEL else f"Mean per {level}",
+    ))
+
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title=f"{metric} ({unit})",
+        yaxis_range=y_range,
+        legend=dict(orientation="h", y=-0.3),
+        hovermode="x unified",
+        template="plotly_white"
+    )
+    return fig
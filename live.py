@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+import streamlit as st
+
+from sheet_sync import add_listener, stored_frame, sync_error, sync_sheets
+from utils import VITALS_DATASET
+from utils2 import SCORE_DATASET
+
+# -------------------------
+# Live Feed
+# -------------------------
+# One background poller per process keeps the synced sheets up to date with
+# small delta fetches. Every ingested row is also pushed into a bounded ring
+# buffer per dataset, which the live fragments on HOME and READINGS read from
+# without touching the sheet or rerunning the whole page.
+#
+# The default patient's datasets are watched from the start; another patient's
+# datasets join the poll the first time a page asks for their live readings.
+#
+# A failed poll (an exception, or a sync error recorded for any dataset) is
+# logged and the poller waits twice as long before the next one, up to
+# LIVE_MAX_BACKOFF; the first good poll returns to LIVE_POLL_INTERVAL.
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_INTERVAL = 5  # seconds
+LIVE_MAX_BACKOFF = 120  # seconds
+LIVE_BUFFER_SIZE = 5000
+LIVE_DATASETS = [VITALS_DATASET, SCORE_DATASET]
+
+
+def _fill(buffer, frame):
+    buffer["columns"] = list(frame.columns)
+    buffer["rows"].extend(frame.itertuples(index=False, name=None))
+    buffer["version"] += 1
+
+
+def _track(feed, dataset):
+    def on_change(frame, new_rows):
+        buffer = feed["buffers"][dataset]
+        with feed["lock"]:
+            if new_rows is None:
+                buffer["rows"].clear()
+                _fill(buffer, frame.tail(LIVE_BUFFER_SIZE))
+            else:
+                _fill(buffer, new_rows)
+
+    add_listener(dataset, "live", on_change)
+
+
+def _watch(feed, dataset):
+    # Caller holds feed["watch_lock"]
+    feed["buffers"][dataset] = {"rows": deque(maxlen=LIVE_BUFFER_SIZE), "columns": [], "version": 0}
+    _track(feed, dataset)
+    frame = stored_frame(dataset)
+    with feed["lock"]:
+        if not feed["buffers"][dataset]["rows"]:
+            _fill(feed["buffers"][dataset], frame.tail(LIVE_BUFFER_SIZE))
+
+
+def _poll(feed):
+    failures = 0
+    while True:
+        try:
+            datasets = list(feed["buffers"])
+            sync_sheets(datasets, force=True)
+            errors = [sync_error(dataset) for dataset in datasets if sync_error(dataset) is not None]
+            feed["error"] = str(errors[0]) if errors else None
+            feed["polled_at"] = pd.Timestamp.now()
+            if errors:
+                logger.warning("Live poll could not sync: %s", feed["error"])
+            failures = failures + 1 if errors else 0
+        except Exception as exc:
+            # The poller must outlive any single failure, or the live views silently go stale
+            logger.exception("Live poll failed")
+            feed["error"] = f"{type(exc).__name__}: {exc}"
+            failures += 1
+        time.sleep(min(LIVE_POLL_INTERVAL * 2 ** failures, LIVE_MAX_BACKOFF))
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_feed():
+    feed = {
+        "lock": threading.Lock(),
+        "watch_lock": threading.Lock(),
+        "buffers": {},
+        "error": None,
+        "polled_at": None,
+    }
+
+    with feed["watch_lock"]:
+        for dataset in LIVE_DATASETS:
+            _watch(feed, dataset)
+
+    threading.Thread(target=_poll, args=(feed,), name="live-feed-poller", daemon=True).start()
+    return feed
+
+
+def recent_readings(dataset, since=None):
+    # Snapshot of the ring buffer as a frame, optionally limited to rows at or after `since`
+    feed = get_live_feed()
+    if dataset not in feed["buffers"]:
+        with feed["watch_lock"]:
+            if dataset not in feed["buffers"]:
+                _watch(feed, dataset)
+
+    with feed["lock"]:
+        buffer = feed["buffers"][dataset]
+        frame = pd.DataFrame(list(buffer["rows"]), columns=buffer["columns"])
+
+    if since is not None and not frame.empty:
+        frame = frame[frame["Timestamp"] >= since]
+    return frame
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+
+import sheets_client
+from perf import span
+from sheet_sync import sync_sheets
+from utils import load_data_from_gsheets, vitals_dataset
+from utils2 import load_score_data, scores_dataset
+
+# -------------------------
+# Page Data Access
+# -------------------------
+# Pages call start_loading(patient_id) as soon as they know the patient and
+# load_frames(...) where they first need the data. The sync behind both runs
+# on a shared thread pool: one job per patient brings the vitals and the scores
+# up to date together (one batchGet when they share a spreadsheet, concurrent
+# requests when they don't), and a job already in flight for the patient, from
+# any session, is joined instead of queued again.
+#
+# Widgets drawn between the two calls render while the data is on its way; if
+# it is still not there when load_frames is reached, skeleton placeholders
+# stand in until it arrives. The frames themselves come from the usual loaders,
+# which then find their datasets fresh and only hand out this session's copy.
+
+LOADERS = {
+    "vitals": (vitals_dataset, load_data_from_gsheets),
+    "scores": (scores_dataset, load_score_data),
+}
+PLACEHOLDER_DELAY = 0.1  # seconds a load may take before placeholders are shown
+SKELETON_BLOCK = '<div style="height:{height}px;border-radius:0.5rem;background:rgba(128,128,128,0.12)"></div>'
+
+
+@st.cache_resource(show_spinner=False)
+def _loader():
+    # Process-wide: shared by every session so in-flight syncs can be joined
+    return {
+        "pool": ThreadPoolExecutor(max_workers=sheets_client.POOL_SIZE, thread_name_prefix="page-load"),
+        "lock": threading.Lock(),
+        "in_flight": {},
+    }
+
+
+def _finished(loader, patient_id, future):
+    with loader["lock"]:
+        if loader["in_flight"].get(patient_id) is future:
+            del loader["in_flight"][patient_id]
+
+
+def start_loading(patient_id):
+    # Starts (or joins) the sync of the patient's datasets and returns its future without waiting
+    loader = _loader()
+    with loader["lock"]:
+        future = loader["in_flight"].get(patient_id)
+        if future is not None:
+            return future
+        datasets = [dataset(patient_id) for dataset, _ in LOADERS.values()]
+        future = loader["in_flight"][patient_id] = loader["pool"].submit(sync_sheets, datasets)
+    # Outside the lock: the callback runs right here if the sync already finished
+    future.add_done_callback(lambda done: _finished(loader, patient_id, done))
+    return future
+
+
+def _skeleton(kinds):
+    st.caption(f"⏳ Loading {' and '.join(kinds)}...")
+    for col in st.columns(3):
+        col.markdown(SKELETON_BLOCK.format(height=90), unsafe_allow_html=True)
+    st.markdown(SKELETON_BLOCK.format(height=320), unsafe_allow_html=True)
+
+
+def load_frames(patient_id, kinds=tuple(LOADERS)):
+    # This session's frames for `kinds` ("vitals", "scores"), in that order
+    future = start_loading(patient_id)
+    with span("load.wait", patient=patient_id):
+        if not wait([future], timeout=PLACEHOLDER_DELAY).done:
+            slot = st.empty()
+            with slot.container():
+                _skeleton(kinds)
+            wait([future])
+            slot.empty()
+        # Re-raises anything sync_sheets did not record as a per-dataset error
+        future.result()
+    return [LOADERS[kind][1](patient_id) for kind in kinds]
+
+
+def refresh_frames(patient_id, kinds=tuple(LOADERS)):
+    # Forced re-sync of the patient's datasets for `kinds` in one sync_sheets call (one batchGet per spreadsheet)
+    sync_sheets([LOADERS[kind][0](patient_id) for kind in kinds], force=True)
@@ -1,8 +1,22 @@
+import pandas as pd
 import streamlit as st
-from utils2 import load_score_data
-from utils import load_data_from_gsheets
+from alerts import alert_log
+import analytics
+import figures
+from daily_stats import get_daily_rollup
+from live import LIVE_POLL_INTERVAL, get_live_feed, recent_readings
+from patients import select_patient
+from perf import perf_panel, plotly_chart, span
+from page_data import load_frames, start_loading
+from sheet_sync import dataset_version
+from trends import get_trends
+from utils2 import scores_dataset
+from utils import alerts_dataset, vitals_dataset
 
 st.title("DASHBOARD ")
+patient_id = select_patient()
+# The sync runs in the background while the inputs below are drawn
+start_loading(patient_id)
 
 # -------------------------
 # User Inputs for Calories
@@ -20,81 +34,78 @@ with c3:
 # -------------------------
 # Comparison Mode Selection
 # -------------------------
-compare_mode = st.selectbox("Compare with:", ["Previous Reading", "Mean Value"], index=0)
+compare_mode = st.selectbox(
+    "Compare with:", ["Previous Reading", "Mean Value", "Baseline"], index=0,
+    help="Baseline: the patient's exponentially weighted running average (one-day half-life)",
+)
+live_mode = st.toggle("🔴 Live mode", help=f"Update the metrics every {LIVE_POLL_INTERVAL} seconds from the live feed")
 
-# -------------------------
-# Function to Get Latest Readings
-# -------------------------
-def get_latest_readings(user_weight, timer, MET, mode):
-    # Load vital data
-    temp_df = load_data_from_gsheets()  # Expecting columns: Date, Time, SpO2, Heart Rate, Temperature
-
-    # For Temperature, Heart Rate and SpO2, extract the latest and comparison values
-    latest_temperature = temp_df.iloc[-1]["Temperature"]
-    latest_heart_rate  = temp_df.iloc[-1]["Heart Rate"]
-    latest_spo2        = temp_df.iloc[-1]["SpO2"]
-
-    if mode == "Previous Reading":
-        prev_temperature = temp_df.iloc[-2]["Temperature"]
-        prev_heart_rate  = temp_df.iloc[-2]["Heart Rate"]
-        prev_spo2        = temp_df.iloc[-2]["SpO2"]
-    else:  # Mean Value comparison
-        prev_temperature = temp_df["Temperature"].mean()
-        prev_heart_rate  = temp_df["Heart Rate"].mean()
-        prev_spo2        = temp_df["SpO2"].mean()
-
-    # Load score data
-    score_df = load_score_data()  # Assuming this dataset has a column "Score"
-    latest_score = score_df.iloc[-1]["Score"]
-    latest_kicks = latest_score / 10   # Given that score divided by 10 equals kicks
-
-    if mode == "Previous Reading":
-        prev_score  = score_df.iloc[-2]["Score"]
-        prev_kicks  = prev_score / 10
-    else:  # Mean Value comparison
-        prev_score  = score_df["Score"].mean()
-        prev_kicks  = prev_score / 10
-
-    # Calculate kick duration in seconds.
-    # Here we assume timer represents a time window for all kicks (latest or average);
-    # we use total kicks for latest reading to derive per-kick duration.
-    total_kicks = latest_kicks
-    kick_duration_sec = timer / total_kicks if total_kicks > 0 else 1
-
-    # Calculate duration in hours for the latest and comparison kicks
-    latest_hours = (latest_kicks * kick_duration_sec) / 3600
-    prev_hours   = (prev_kicks * kick_duration_sec) / 3600
-
-    # Calculate calories burned for latest and comparison
-    latest_calories = MET * user_weight * latest_hours
-    prev_calories   = MET * user_weight * prev_hours
-
-    return {
-        "Temperature": (latest_temperature, latest_temperature - prev_temperature),
-        "Heart Rate (BPM)": (latest_heart_rate, latest_heart_rate - prev_heart_rate),
-        "SpO₂ (%)": (latest_spo2, latest_spo2 - prev_spo2),
-        "Score": (latest_score, latest_score - prev_score),
-        "Calories Burned": (latest_calories, latest_calories - prev_calories),
-    }
+def history_means():
+    # All-history means from the daily rollups, so the live view never needs the full frames
+    datasets = [vitals_dataset(patient_id), scores_dataset(patient_id)]
+    key = tuple((dataset, dataset_version(dataset)) for dataset in datasets)
+    with span("home.history_means"):
+        return analytics.memoized(key, analytics.history_means, [get_daily_rollup(dataset) for dataset in datasets])
 
-# -------------------------
-# Get and Display Metrics
-# -------------------------
-readings = get_latest_readings(user_weight, timer, MET, compare_mode)
 
-# Create columns for metrics display
-col1, col2 = st.columns(2)
-col3, col4 = st.columns(2)
-col5, _ = st.columns(2)
+def baselines():
+    # Latest EWMA baselines, maintained incrementally by the trend engine
+    return analytics.latest_baselines([get_trends(vitals_dataset(patient_id)), get_trends(scores_dataset(patient_id))])
 
-col1.metric("Temperature", f"{readings['Temperature'][0]}°F", f"{readings['Temperature'][1]:+.1f}°F", border=True)
-col2.metric("Heart Rate (BPM)", f"{readings['Heart Rate (BPM)'][0]}", f"{readings['Heart Rate (BPM)'][1]:+}", border=True)
-col3.metric("SpO₂ (%)", f"{readings['SpO₂ (%)'][0]}%", f"{readings['SpO₂ (%)'][1]:+}%", border=True)
-col4.metric("Score", f"{readings['Score'][0]}", f"{readings['Score'][1]:+}", border=True)
-col5.metric("Calories Burned", f"{readings['Calories Burned'][0]:.2f} kcal", f"{readings['Calories Burned'][1]:+.2f} kcal", border=True)
 
-import plotly.graph_objects as go
-import pandas as pd
+def show_metrics(readings):
+    # Create columns for metrics display
+    col1, col2 = st.columns(2)
+    col3, col4 = st.columns(2)
+    col5, _ = st.columns(2)
+
+    col1.metric("Temperature", f"{readings['Temperature'][0]:g}°F", f"{readings['Temperature'][1]:+.1f}°F", border=True)
+    col2.metric("Heart Rate (BPM)", f"{readings['Heart Rate (BPM)'][0]:g}", f"{readings['Heart Rate (BPM)'][1]:+g}", border=True)
+    col3.metric("SpO₂ (%)", f"{readings['SpO₂ (%)'][0]:g}%", f"{readings['SpO₂ (%)'][1]:+g}%", border=True)
+    col4.metric("Score", f"{readings['Score'][0]:g}", f"{readings['Score'][1]:+g}", border=True)
+    col5.metric("Calories Burned", f"{readings['Calories Burned'][0]:.2f} kcal", f"{readings['Calories Burned'][1]:+.2f} kcal", border=True)
+
+
+# -------------------------
+# Get and Display Metrics
+# -------------------------
+if live_mode:
+    # Only this fragment reruns on the timer; it reads the live ring buffers, never the sheet
+    @st.fragment(run_every=LIVE_POLL_INTERVAL)
+    def live_metrics():
+        feed = get_live_feed()
+        temp_df, score_df = recent_readings(vitals_dataset(patient_id)), recent_readings(scores_dataset(patient_id))
+        if len(temp_df) < 2 or len(score_df) < 2:
+            st.info("Waiting for live readings...")
+            return
+        with span("home.latest_readings", rows=len(temp_df)):
+            readings = analytics.latest_readings(temp_df, score_df, user_weight, timer, MET, compare_mode, means=baselines() if compare_mode == "Baseline" else history_means())
+        show_metrics(readings)
+        if feed["error"]:
+            st.caption(f"⚠️ Live feed error: {feed['error']}")
+        elif feed["polled_at"] is not None:
+            st.caption(f"Live · last update {feed['polled_at']:%H:%M:%S}")
+
+    live_metrics()
+else:
+    temp_df, score_df = load_frames(patient_id)
+    if len(temp_df) < 2 or len(score_df) < 2:
+        st.info("Not enough readings and scores yet for this patient.")
+        st.stop()
+    key = tuple((dataset, dataset_version(dataset)) for dataset in [vitals_dataset(patient_id), scores_dataset(patient_id)])
+    with span("home.latest_readings", rows=len(temp_df)):
+        readings = analytics.memoized(
+            key, analytics.latest_readings, temp_df, score_df, user_weight=user_weight, timer=timer, MET=MET,
+            mode=compare_mode, means=baselines() if compare_mode == "Baseline" else None,
+        )
+    show_metrics(readings)
+
+# Alerts raised in the last 24 hours, read from the alert engine's event log
+events = alert_log(alerts_dataset(patient_id))
+recent_alerts = analytics.recent_alerts(events, pd.Timestamp.now())
+if not recent_alerts.empty:
+    latest = recent_alerts.iloc[-1]
+    st.warning(f"🚨 {len(recent_alerts)} alert(s) in the last 24 hours. Latest: {latest['Message']} at {latest['Timestamp']:%d-%m-%Y %H:%M:%S}")
 
 # -------------------------
 # Plotting Calories Burned Over Time
@@ -105,39 +116,18 @@ st.subheader("Calories Burned Over Time")
 # Dropdown to choose chart type
 chart_type = st.selectbox("Select chart type", ["Line", "Bar"])
 
-# Prepare the data
-score_df = load_score_data()
-score_df["Kicks"] = score_df["Score"] / 10
-score_df["Calories Burned"] = MET * user_weight * (score_df["Kicks"] * (timer / score_df["Kicks"]) / 3600)
-
-# Convert Date or Datetime
-if "Date" in score_df.columns:
-    score_df["Date"] = pd.to_datetime(score_df["Date"], dayfirst=True)
-    x_axis = score_df["Date"]
-elif "Timestamp" in score_df.columns:
-    score_df["Timestamp"] = pd.to_datetime(score_df["Timestamp"])
-    x_axis = score_df["Timestamp"]
-else:
-    x_axis = score_df.index
-
-# Create the chart
-fig = go.Figure()
-
-if chart_type == "Line":
-    fig.add_trace(go.Scatter(x=x_axis, y=score_df["Score"], mode="lines+markers", name="Score", line=dict(color="royalblue")))
-    fig.add_trace(go.Scatter(x=x_axis, y=score_df["Calories Burned"], mode="lines+markers", name="Calories Burned (kcal)", line=dict(color="tomato")))
-else:
-    fig.add_trace(go.Bar(x=x_axis, y=score_df["Score"], name="Score", marker_color="royalblue"))
-    fig.add_trace(go.Bar(x=x_axis, y=score_df["Calories Burned"], name="Calories Burned (kcal)", marker_color="tomato"))
-
-fig.update_layout(
-    title="Score and Calories Burned Over Time",
-    xaxis_title="Date",
-    yaxis_title="Value",
-    legend_title="Metric",
-    template="plotly_white"
-)
-
-st.plotly_chart(fig, use_container_width=True)
+# Prepare the data; outside live mode the scores were already loaded for the metrics
+if live_mode:
+    (score_df,) = load_frames(patient_id, ["scores"])
+with span("home.calories_over_time", rows=len(score_df)):
+    calories = analytics.memoized(
+        (scores_dataset(patient_id), dataset_version(scores_dataset(patient_id))), analytics.calories_over_time, score_df,
+        user_weight=user_weight, timer=timer, MET=MET,
+    )
+chart_key = (scores_dataset(patient_id), dataset_version(scores_dataset(patient_id)), user_weight, timer, MET)
+fig = figures.figure(chart_key, figures.calories_chart, calories, chart_type=chart_type)
+
+plotly_chart(fig, use_container_width=True)
+perf_panel()
 
 
@@ -1,61 +1,72 @@
 import streamlit as st
-from utils import load_data_from_gsheets
-import numpy as np
 import pandas as pd
-import plotly.express as px
-from utils import load_data_from_gsheets
-from utils2 import load_score_data
+import analytics
+from daily_stats import get_daily_rollup
+import query
+from exports import EXPORT_FORMATS, export_button
+from schema import memory_footprint
+from patients import select_patient
+from perf import perf_panel, span
+from sheet_sync import dataset_version
+from page_data import load_frames
+from utils import VITAL_METRICS, vitals_dataset
 st.title(" DATASET")
+patient_id = select_patient()
 st.markdown("---")
 
 st.subheader("📋 MEDICAL DATASET")
-df = load_data_from_gsheets()
-preview_df = df.copy()
-preview_df['Date'] = preview_df['Date'].dt.strftime('%d-%m-%Y')
-preview_df['Time'] = preview_df['Time'].astype(str)
+df, score_df = load_frames(patient_id)
 
-st.dataframe(preview_df, use_container_width=True)
-st.download_button("⬇ Download Full Dataset", df.to_csv(index=False), "Medical_Readings.csv", "text/csv")
+# Date and Time are formatted views of Timestamp; no text columns are built for the preview
+TIMESTAMP_VIEWS = {
+    "Date": st.column_config.DatetimeColumn("Date", format="DD-MM-YYYY"),
+    "Time": st.column_config.DatetimeColumn("Time", format="HH:mm:ss"),
+}
+preview_df = pd.DataFrame({"Date": df["Timestamp"], "Time": df["Timestamp"]}).join(df[VITAL_METRICS + ["Timestamp"]])
+
+st.dataframe(preview_df, use_container_width=True, column_config=TIMESTAMP_VIEWS)
+# Export files are only built when a button is clicked (see exports.py)
+export_button("⬇ Download Full Dataset", vitals_dataset(patient_id), "CSV", "Medical_Readings", VITAL_METRICS + ["Timestamp"])
+
+with st.expander("⬇ Export readings"):
+    c1, c2 = st.columns(2)
+    export_format = c1.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+    export_columns = c2.multiselect("Columns", VITAL_METRICS, default=VITAL_METRICS, key="export_columns")
+    export_dates = query.available_dates(df)
+    if export_dates:
+        date_range = st.date_input(
+            "Dates", (export_dates[0], export_dates[-1]), min_value=export_dates[0], max_value=export_dates[-1], key="export_dates"
+        )
+        first_date, last_date = (date_range[0], date_range[-1]) if date_range else (export_dates[0], export_dates[-1])
+        export_dates = [day for day in export_dates if first_date <= day <= last_date]
+    export_button(
+        "Download", vitals_dataset(patient_id), export_format, "Medical_Readings", export_columns,
+        dates=export_dates, disabled=not export_columns or not export_dates, key="export_download",
+    )
+
+total_bytes, row_bytes = memory_footprint(df)
+st.caption(f"In memory: {total_bytes / 1e6:.2f} MB for {len(df):,} readings ({row_bytes:.0f} bytes/row)")
 
 
 # Summary Table
 st.markdown("---")
 st.subheader("📋 AGGREGATED METRIC TABLE")
 
-available_dates = sorted(df['Date'].dt.strftime('%d-%m-%Y').unique(), reverse=True)
+vitals_rollup = get_daily_rollup(vitals_dataset(patient_id))
+available_dates = list(pd.DatetimeIndex(vitals_rollup['stats']['Date'].unique()).sort_values(ascending=False).strftime('%d-%m-%Y'))
 selected_dates = st.multiselect("Select date(s) to view stats table:", available_dates, default=available_dates[:1])
 
 if selected_dates:
-    summary_dict = {metric: {'count': 0, 'mean': [], 'median': [], 'max': [], 'min': []} for metric in ['SpO2', 'Temperature', 'Heart Rate']}
-
-    for date_str in selected_dates:
-        df_selected = df[df['Date'].dt.strftime('%d-%m-%Y') == date_str]
-        for metric in summary_dict.keys():
-            values = df_selected[metric].dropna()
-            summary_dict[metric]['count'] += values.count()
-            summary_dict[metric]['mean'].append(values.mean())
-            summary_dict[metric]['median'].append(values.median())
-            summary_dict[metric]['max'].append(values.max())
-            summary_dict[metric]['min'].append(values.min())
+    metrics = ['SpO2', 'Temperature', 'Heart Rate']
 
-    summary_rows = []
-    for metric in ['SpO2', 'Temperature', 'Heart Rate']:
-        data = summary_dict[metric]
-        summary_rows.append({
-            'Metric': metric,
-            'Count': data['count'],
-            'Mean': np.mean(data['mean']),
-            'Median': np.median(data['median']),
-            'Max': np.max(data['max']),
-            'Min': np.min(data['min'])
-        })
-
-    summary_df = pd.DataFrame(summary_rows)
-    summary_df = summary_df[['Metric', 'Count', 'Mean', 'Median', 'Max', 'Min']]
+    # Combine the selected days from the shared daily rollup: weighted means, merged medians, global min/max
+    days = tuple(pd.to_datetime(selected_dates, format='%d-%m-%Y'))
+    key = (vitals_dataset(patient_id), dataset_version(vitals_dataset(patient_id)))
+    with span("overview.summarize_days", days=len(days)):
+        summary_df = analytics.memoized(key, analytics.days_summary, vitals_rollup, days=days, metrics=tuple(metrics))
 
     st.dataframe(summary_df.style.format({'Mean': '{:.2f}', 'Median': '{:.2f}', 'Max': '{:.2f}', 'Min': '{:.2f}'}), use_container_width=True)
-    csv = summary_df.to_csv(index=False)
-    st.download_button("⬇ Download Summary Table", csv, "Daily_Summary.csv", "text/csv")
+    st.download_button("⬇ Download Summary Table", lambda: summary_df.to_csv(index=False), "Daily_Summary.csv", "text/csv")
 else:
     st.info("Please select at least one date to display the summary table.")
  
@@ -63,13 +74,17 @@ st.markdown("---")
  
 #scorecard
 st.subheader("📋 SCORE DATA")
-# Load the score data
-score_df = load_score_data()
-
-unique_dates = score_df['Date'].dt.date.unique()
+unique_dates = query.available_dates(score_df)
 selected_dates = st.multiselect("Select Dates", options=unique_dates, default=unique_dates)
 
-filtered_df = score_df[score_df['Date'].dt.date.isin(selected_dates)]
+with span("overview.filter_scores") as s:
+    filtered_df = query.select_rows(score_df, selected_dates)
+    s.set(rows=len(filtered_df))
+score_preview = pd.DataFrame({"Date": filtered_df["Timestamp"], "Time": filtered_df["Timestamp"]}).join(filtered_df[["Score", "Timestamp"]])
+
+st.dataframe(score_preview, use_container_width=True, column_config=TIMESTAMP_VIEWS)
 
-st.dataframe(filtered_df.sort_values("Timestamp"), use_container_width=True)
+total_bytes, row_bytes = memory_footprint(score_df)
+st.caption(f"In memory: {total_bytes / 1e6:.2f} MB for {len(score_df):,} scores ({row_bytes:.0f} bytes/row)")
 
+perf_panel()
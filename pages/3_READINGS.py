@@ -1,34 +1,82 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils import load_data_from_gsheets
-from utils2 import load_score_data
-import plotly.graph_objects as go
+import analytics
+import figures
+from alerts import alert_log
+from daily_stats import get_daily_rollup
+from patients import select_patient
+from perf import perf_panel, plotly_chart, span
+from sheet_sync import dataset_version
+from page_data import load_frames, refresh_frames
+from utils import alerts_dataset, vitals_dataset
+from utils2 import scores_dataset
+from query import available_dates
+from downsample import DOWNSAMPLE_METHODS
+from live import LIVE_POLL_INTERVAL, get_live_feed, recent_readings
+from trends import BASELINE_BAND, TREND_WINDOWS, get_trends
+
+TREND_OVERLAYS = [f"Mean {label}" for label in TREND_WINDOWS] + ["Baseline"]
+VITAL_CHARTS = [("Temperature", "°F", [70, 105]), ("Heart Rate", "bpm", [30, 110]), ("SpO2", "%", [75, 105])]
 
-df = load_data_from_gsheets()
 st.title("📈 MONITORING DASHBOARD")
+patient_id = select_patient()
+# Vitals and scores are synced together; the scores tab reuses score_df
+df, score_df = load_frames(patient_id)
+
+# -------------------------
+# Live vitals (only this fragment reruns on the timer)
+# -------------------------
+if st.toggle("🔴 Live mode", help=f"Stream the latest readings every {LIVE_POLL_INTERVAL} seconds"):
+    live_window = st.select_slider("Live window", options=[5, 15, 30, 60, 120], value=15, format_func=lambda m: f"{m} min")
+
+    # Only live mode draws plotly.express charts on this page
+    import plotly.express as px
+
+    @st.fragment(run_every=LIVE_POLL_INTERVAL)
+    def live_vitals():
+        feed = get_live_feed()
+        recent = recent_readings(vitals_dataset(patient_id))
+        if recent.empty:
+            st.info("Waiting for live readings...")
+            return
+
+        recent = recent[recent["Timestamp"] >= recent["Timestamp"].iloc[-1] - pd.Timedelta(minutes=live_window)]
+        for col, (y_col, unit, y_range) in zip(st.columns(3), VITAL_CHARTS):
+            fig = px.line(recent, x="Timestamp", y=y_col, title=f"Live {y_col}")
+            fig.update_layout(xaxis_title="Time", yaxis_title=f"{y_col} ({unit})", yaxis_range=y_range, uirevision=y_col)
+            plotly_chart(fig, container=col, use_container_width=True, key=f"live_{y_col}")
+
+        if feed["error"]:
+            st.caption(f"⚠️ Live feed error: {feed['error']}")
+        elif feed["polled_at"] is not None:
+            st.caption(f"Live · {len(recent):,} readings in window · last update {feed['polled_at']:%H:%M:%S}")
+
+    live_vitals()
+    st.markdown("---")
 
 col1, col2 = st.columns([2, 2])
 with col1:
-    unique_dates = sorted(df['Date'].dt.date.unique())
+    unique_dates = available_dates(df)
     selected_dates = st.multiselect("Select Date(s):", unique_dates, default=unique_dates)
 with col2:
     time_range = st.slider("Select Time Range (Hours):", 0, 24, (0, 24), step=1)
 
-df_filtered = df[df['Date'].dt.date.isin(selected_dates)].copy()
-df_filtered['Timestamp'] = pd.to_datetime(df_filtered['Date'].astype(str) + ' ' + df_filtered['Time'].astype(str))
 start_hour, end_hour = time_range
-df_filtered = df_filtered[(df_filtered['Timestamp'].dt.hour >= start_hour) & (df_filtered['Timestamp'].dt.hour <= end_hour)]
-
-# Normalize dates to the same day to align times across dates
-df_filtered['Timestamp'] = df_filtered['Timestamp'].apply(lambda t: t.replace(year=2000, month=1, day=1))
+seconds = (start_hour * 3600, (end_hour + 1) * 3600)
+# Filtered and downsampled frames are reused until the data or the filters change
+filter_key = (vitals_dataset(patient_id), dataset_version(vitals_dataset(patient_id)), tuple(selected_dates), seconds)
+with span("readings.filter", days=len(selected_dates)) as s:
+    df_filtered = analytics.memoized(filter_key, analytics.aligned_readings, df, dates=tuple(selected_dates), seconds=seconds)
+    s.set(rows=len(df_filtered))
 
 if df_filtered.empty:
     st.warning("No data for the selected filters.")
     st.stop()
 
-
-#check_and_send_email(df_filtered, email_config)
+# Alerts whose episode overlaps the selected dates and hours, from the alert engine's event log
+events = alert_log(alerts_dataset(patient_id))
+with span("readings.filter_alerts", rows=len(events)):
+    selected_events = analytics.memoized(filter_key + (len(events),), analytics.alerts_in_window, events, df, dates=tuple(selected_dates), seconds=seconds)
 
 #css script for better navigation
 st.markdown("""
@@ -51,68 +99,59 @@ tab1, tab2, tab3, tab4 = st.tabs(["🌡 Temperature", "❤️ Heart Rate", "🫁
 def display_tab(tab, y_col, unit, y_range):
     with tab:
         st.subheader(f"{y_col} Trend")
-        fig = px.line(
-            df_filtered,
-            x='Timestamp',
-            y=y_col,
-            color=df_filtered['Date'].dt.strftime('%d-%m-%Y'),
-            line_shape='linear',
-            markers=False,
-            
+        # Thin the day lines to about one point per pixel between them, keeping every abnormal reading
+        method = st.selectbox("Downsampling", DOWNSAMPLE_METHODS, key=f"downsample_{y_col}")
+        with span("readings.downsample", metric=y_col, method=method) as s:
+            plot_df, dropped, abnormal_count = analytics.memoized(filter_key, analytics.chart_series, df_filtered, metric=y_col, method=method)
+            s.set(rows=len(plot_df))
+        overlays = st.multiselect(
+            "Trend overlays", TREND_OVERLAYS, key=f"overlays_{y_col}",
+            help=f"Rolling means, and the EWMA baseline with a ±{BASELINE_BAND}σ band",
         )
-        fig.update_layout(
-            xaxis_title="Time",
-            yaxis_title=f"{y_col} ({unit})",
-            yaxis_range=y_range,
-            legend_title="Date",
-            legend=dict(orientation="h", y=-0.3),
-            xaxis=dict(
-                tickformat="%H:%M:%S",
-                dtick=13000,  # setting the time interval
-                tickangle=90
-            )
+        with span("readings.trend_overlay", metric=y_col):
+            trend = analytics.memoized(filter_key + (method,), analytics.trend_overlay, plot_df, get_trends(vitals_dataset(patient_id)), metric=y_col)
+
+        fig = figures.figure(
+            filter_key + (method,), figures.readings_chart, plot_df, trend,
+            metric=y_col, unit=unit, y_range=y_range, overlays=overlays,
         )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
+        deviations = trend["Deviation"].abs()
+        if deviations.notna().any():
+            worst = trend.loc[deviations.idxmax()]
+            st.caption(f"Largest deviation from baseline: {worst['Deviation']:+.1f}σ at {df.loc[worst.name, 'Timestamp']:%d-%m-%Y %H:%M:%S}.")
+        if dropped:
+            st.caption(f"Showing {len(plot_df):,} of {len(df_filtered):,} points ({dropped:,} dropped by {method} downsampling).")
 
         with st.expander(f"📌 Highlights for {y_col}"):
-            abnormal = None
-            if y_col == "Temperature":
-                abnormal = df_filtered[df_filtered[y_col] > 99.5]
-            elif y_col == "Heart Rate":
-                abnormal = df_filtered[(df_filtered[y_col] < 60) | (df_filtered[y_col] > 100)]
-            elif y_col == "SpO2":
-                abnormal = df_filtered[df_filtered[y_col] < 95]
-
-            if abnormal is not None and not abnormal.empty:
-                st.warning(f"⚠️ {len(abnormal)} abnormal {y_col} reading(s) detected.")
-                abnormal_display = abnormal.copy()
-                abnormal_display['Time'] = abnormal_display['Timestamp'].dt.strftime('%H:%M:%S')
-                abnormal_display['Date'] = abnormal_display['Date'].dt.strftime('%d-%m-%Y')
-                st.dataframe(abnormal_display[['Time', 'Date', y_col]], use_container_width=True)
-            else:
-                st.success(f"✅ All {y_col} readings are normal.")
+            metric_events = selected_events[selected_events['Metric'] == y_col]
 
-display_tab(tab1, "Temperature", "°F", [70, 105])
-display_tab(tab2, "Heart Rate", "bpm", [30, 110])
-display_tab(tab3, "SpO2", "%", [75, 105])
+            if abnormal_count == 0:
+                st.success(f"✅ All {y_col} readings are normal.")
+            else:
+                st.warning(f"⚠️ {abnormal_count} abnormal {y_col} reading(s), {len(metric_events)} alert(s) detected.")
+            if not metric_events.empty:
+                st.dataframe(pd.DataFrame({
+                    'Time': metric_events['Timestamp'].dt.strftime('%H:%M:%S'),
+                    'Date': metric_events['Timestamp'].dt.strftime('%d-%m-%Y'),
+                    'Until': metric_events['End'].dt.strftime('%d-%m-%Y %H:%M:%S'),
+                    'Alert': metric_events['Message'],
+                    y_col: metric_events['Value'],
+                }), use_container_width=True, hide_index=True)
+
+for tab, (y_col, unit, y_range) in zip([tab1, tab2, tab3], VITAL_CHARTS):
+    display_tab(tab, y_col, unit, y_range)
 
 with tab4:
     st.title("Cumulative Score")
 
-    # Load data
-    score_df = load_score_data()
-
     if score_df.empty:
         st.warning("No score data to display.")
     else:
-        # Aggregate metrics by date
-        agg_df = score_df.groupby(score_df['Date'].dt.date).agg(
-            Total_Score=("Score", "sum"),
-            Average_Score=("Score", "mean"),
-            Min_Score=("Score", "min"),
-            Max_Score=("Score", "max")
-        ).reset_index()
-        agg_df.columns = ["Date", "Total Score", "Average Score", "Min Score", "Max Score"]
+        # Per-date metrics come from the shared daily rollup
+        score_key = (scores_dataset(patient_id), dataset_version(scores_dataset(patient_id)))
+        with span("readings.score_summary"):
+            agg_df = analytics.memoized(score_key, analytics.score_table, get_daily_rollup(scores_dataset(patient_id)))
 
         # Chart type selection
         chart_type = st.radio(
@@ -133,110 +172,55 @@ with tab4:
         filtered_df = agg_df[agg_df["Date"].isin(selected_dates)]
 
         # Plotting
-        if chart_type == "Grouped Bar Chart":
-            fig = go.Figure(data=[
-                go.Bar(name="Total Score", x=filtered_df["Date"], y=filtered_df["Total Score"], marker_color="dodgerblue"),
-                go.Bar(name="Average Score", x=filtered_df["Date"], y=filtered_df["Average Score"], marker_color="orange"),
-                go.Bar(name="Min Score", x=filtered_df["Date"], y=filtered_df["Min Score"], marker_color="green"),
-                go.Bar(name="Max Score", x=filtered_df["Date"], y=filtered_df["Max Score"], marker_color="red")
-            ])
-
-            fig.update_layout(
-                barmode="group",
-                title="Total, Average, Min & Max Scores per Date",
-                xaxis_title="Date",
-                yaxis_title="Score",
-                legend_title="Metrics",
-                legend=dict(orientation="h", y=1.1)
-            )
-        else:
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(
-                x=filtered_df["Date"], y=filtered_df["Total Score"],
-                mode='lines+markers', name='Total Score', line=dict(color='dodgerblue', width=3)
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=filtered_df["Date"], y=filtered_df["Average Score"],
-                mode='lines+markers', name='Average Score', line=dict(color='orange', width=3)
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=filtered_df["Date"], y=filtered_df["Min Score"],
-                mode='lines+markers', name='Min Score', line=dict(color='green', dash='dot', width=2)
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=filtered_df["Date"], y=filtered_df["Max Score"],
-                mode='lines+markers', name='Max Score', line=dict(color='red', dash='dash', width=2)
-            ))
-
-            fig.update_layout(
-                title="Score Trends Over Selected Dates",
-                xaxis_title="Date",
-                yaxis_title="Score",
-                legend_title="Metrics",
-                margin=dict(t=60),
-                hovermode="x unified"
-            )
-
-        st.plotly_chart(fig, use_container_width=True)
+        fig = figures.figure(score_key + (tuple(selected_dates),), figures.score_chart, filtered_df, chart_type=chart_type)
+
+        plotly_chart(fig, use_container_width=True)
 
 #................
-    # score 
-    st.subheader("Comprehensive Data Matrix")
-
-    st.dataframe(
-        filtered_df.style.format({
-            "Total Score": "{:.0f}",
-            "Average Score": "{:.2f}",
-            "Min Score": "{:.0f}",
-            "Max Score": "{:.0f}"
-        }),
-        use_container_width=True
-    )
+        # score 
+        st.subheader("Comprehensive Data Matrix")
+
+        st.dataframe(
+            filtered_df.style.format({
+                "Total Score": "{:.0f}",
+                "Average Score": "{:.2f}",
+                "Min Score": "{:.0f}",
+                "Max Score": "{:.0f}"
+            }),
+            use_container_width=True
+        )
     
     
-    st.subheader("Calories Burned Prediction")
-
-    col1, col2, col3 = st.columns(3)
+        st.subheader("Calories Burned Prediction")
 
-    with col1:
-        user_weight = st.number_input("Weight (kg)", min_value=20.0, max_value=200.0, value=70.0)
+        col1, col2, col3 = st.columns(3)
 
-    with col2:
-        timer = st.number_input("Timer (seconds)", min_value=10.0, max_value=1000.0, value=15.0)
+        with col1:
+            user_weight = st.number_input("Weight (kg)", min_value=20.0, max_value=200.0, value=70.0)
 
-    with col3:
-        MET = st.number_input("MET", min_value=0.0, max_value=10.0, value=3.5)
+        with col2:
+            timer = st.number_input("Timer (seconds)", min_value=10.0, max_value=1000.0, value=15.0)
 
-    # Compute total kicks per day
-    filtered_df["Total Kicks"] = filtered_df["Total Score"] / 10
-    kick_duration_per_kick = timer / filtered_df["Total Kicks"].sum()
+        with col3:
+            MET = st.number_input("MET", min_value=0.0, max_value=10.0, value=3.5)
 
-    # Compute duration per day in hours
-    filtered_df["Duration (hrs)"] = (filtered_df["Total Kicks"] * kick_duration_per_kick) / 3600
+        # Kicks, duration and calories per day for the selected dates
+        filtered_df = analytics.calories_per_day(filtered_df, user_weight, timer, MET)
 
-    # Compute calories burned per day
-    filtered_df["Calories Burned"] = MET * user_weight * filtered_df["Duration (hrs)"]
-
-    st.markdown("**Estimated Calories Burned per Date**")
-    st.dataframe(
-        filtered_df[["Date", "Total Score", "Total Kicks", "Duration (hrs)", "Calories Burned"]].style.format({
-            "Total Score": "{:.0f}",
-            "Total Kicks": "{:.0f}",
-            "Duration (hrs)": "{:.3f}",
-            "Calories Burned": "{:.2f}"
-        }),
-        use_container_width=True
-    )
+        st.markdown("**Estimated Calories Burned per Date**")
+        st.dataframe(
+            filtered_df[["Date", "Total Score", "Total Kicks", "Duration (hrs)", "Calories Burned"]].style.format({
+                "Total Score": "{:.0f}",
+                "Total Kicks": "{:.0f}",
+                "Duration (hrs)": "{:.3f}",
+                "Calories Burned": "{:.2f}"
+            }),
+            use_container_width=True
+        )
 
 if st.button("🔄 Refresh Data Now"):
-    st.cache_data.clear()
-    df = load_data_from_gsheets()
+    # Re-sync only the datasets shown on this page instead of clearing every cache
+    refresh_frames(patient_id)
     st.success("Data refreshed!")
-else:
-    df = load_data_from_gsheets()
-
 
+perf_panel()
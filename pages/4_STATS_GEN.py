@@ -1,36 +1,32 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-import plotly.express as px
-from utils import load_data_from_gsheets
+import analytics
+import figures
+from daily_stats import get_daily_rollup
+from patients import select_patient
+from perf import perf_panel, plotly_chart, span
+from sheet_sync import dataset_version
+from page_data import load_frames
+from utils import vitals_dataset
 
 
-df = load_data_from_gsheets()
 st.title("📊 Daily Vital Statistics Overview")
+patient_id = select_patient()
+(df,) = load_frames(patient_id, ["vitals"])
 
 metrics = ['Temperature', 'Heart Rate', 'SpO2']
-combined_stats = pd.DataFrame()
 
-for metric in metrics:
-    temp_stats = df.groupby(df['Date'].dt.strftime('%d-%m-%Y'))[metric].agg(['count', 'mean', 'median', 'max', 'min']).reset_index()
-    temp_stats = temp_stats.rename(columns={'Date': 'Formatted Date'})
-    temp_stats['Metric'] = metric
-    combined_stats = pd.concat([combined_stats, temp_stats], ignore_index=True)
-
-combined_stats = combined_stats.rename(columns={'Formatted Date': 'Date'})
-combined_stats = combined_stats.melt(id_vars=['Date', 'Metric'], var_name='Stat', value_name='Value')
+with span("stats.daily_summary") as s:
+    # Per-day statistics come from the shared daily rollup instead of one groupby per metric
+    key = (vitals_dataset(patient_id), dataset_version(vitals_dataset(patient_id)))
+    combined_stats = analytics.memoized(key, analytics.daily_stats_long, get_daily_rollup(vitals_dataset(patient_id)), metrics=tuple(metrics))
+    s.set(rows=len(combined_stats))
 
 st.subheader("📊 Statistics Bar Chart")
-fig_bar = px.bar(combined_stats, x='Date', y='Value', color='Stat', barmode='group')
-fig_bar.update_layout(legend_title="Stat", legend=dict(orientation="h", y=-0.3))
-st.plotly_chart(fig_bar, use_container_width=True)
+fig_bar = figures.figure(key, figures.stats_bar_chart, combined_stats)
+plotly_chart(fig_bar, use_container_width=True)
 
 st.subheader("📈 Statistics Line Chart")
-fig_line = px.line(combined_stats, x='Date', y='Value', color='Stat', line_dash='Metric', markers=True)
-fig_line.update_layout(legend_title="Stat", legend=dict(orientation="h", y=-0.3))
-st.plotly_chart(fig_line, use_container_width=True)
-
-
-
-
+fig_line = figures.figure(key, figures.stats_line_chart, combined_stats)
+plotly_chart(fig_line, use_container_width=True)
 
+perf_panel()
@@ -0,0 +1,60 @@
+import pandas as pd
+import streamlit as st
+import analytics
+from alerts import alert_log
+from daily_stats import get_daily_rollup
+from patients import PATIENTS
+from perf import perf_panel, span
+from sheet_sync import sync_error, sync_sheets
+from utils import VITAL_METRICS, alerts_dataset, vitals_dataset
+
+st.title("🩺 CAREGIVER OVERVIEW")
+
+# One concurrent sync for every patient whose TTL ran out, then everything below
+# is read from the per-patient daily rollups and alert logs, never the full frames
+with span("caregiver.sync", patients=len(PATIENTS)):
+    sync_sheets([vitals_dataset(patient_id) for patient_id in PATIENTS])
+
+now = pd.Timestamp.now()
+today = now.normalize()
+with span("caregiver.overview", patients=len(PATIENTS)):
+    rows = []
+    for patient_id, patient in PATIENTS.items():
+        rollup = get_daily_rollup(vitals_dataset(patient_id))
+        latest = rollup["latest"]
+        events = alert_log(alerts_dataset(patient_id))
+        recent_alerts = analytics.recent_alerts(events, now)
+
+        row = {"Patient": patient["name"], "Last Reading": latest["Timestamp"] if latest is not None else pd.NaT}
+        row.update({metric: latest[metric] if latest is not None else None for metric in VITAL_METRICS})
+
+        stats = rollup["stats"]
+        today_stats = stats[stats["Date"] == today].set_index("Metric")
+        row["Readings Today"] = int(today_stats["count"].max()) if not today_stats.empty else 0
+        row["Alerts (24h)"] = len(recent_alerts)
+        row["Latest Alert"] = recent_alerts["Message"].iloc[-1] if not recent_alerts.empty else ""
+        error = sync_error(vitals_dataset(patient_id))
+        row["Sync"] = f"⚠️ {error}" if error is not None else "OK"
+        rows.append(row)
+
+    overview = pd.DataFrame(rows)
+
+c1, c2, c3 = st.columns(3)
+c1.metric("Patients", len(overview), border=True)
+c2.metric("Patients with alerts (24h)", int((overview["Alerts (24h)"] > 0).sum()), border=True)
+c3.metric("Alerts (24h)", int(overview["Alerts (24h)"].sum()), border=True)
+
+st.dataframe(
+    overview.sort_values(["Alerts (24h)", "Patient"], ascending=[False, True]),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "Last Reading": st.column_config.DatetimeColumn("Last Reading", format="DD-MM-YYYY HH:mm:ss"),
+        "Temperature": st.column_config.NumberColumn("Temperature (°F)", format="%.1f"),
+        "Heart Rate": st.column_config.NumberColumn("Heart Rate (BPM)", format="%.0f"),
+        "SpO2": st.column_config.NumberColumn("SpO₂ (%)", format="%.0f"),
+    },
+)
+st.caption(f"Updated {now:%d-%m-%Y %H:%M:%S}. Pick a patient in the sidebar of the other pages for their full history.")
+
+perf_panel()
@@ -0,0 +1,75 @@
+import plotly.express as px
+import streamlit as st
+from page_data import start_loading
+from patients import select_patient
+from perf import perf_panel, plotly_chart, span
+from sessions import RECOVERY_MARGIN, SESSION_LENGTH, get_sessions
+from sheet_sync import sync_error
+from utils import vitals_dataset
+from utils2 import scores_dataset
+
+st.title("🎮 GAME SESSIONS")
+patient_id = select_patient()
+st.caption(
+    f"Each game score is linked to the vitals of the {SESSION_LENGTH.seconds // 60} minutes before it "
+    f"and the recovery after it (heart rate back within {RECOVERY_MARGIN} bpm of the resting rate)."
+)
+
+# Only the sync is needed here: sessions are read from the session table, never the full frames
+start_loading(patient_id).result()
+for dataset in [vitals_dataset(patient_id), scores_dataset(patient_id)]:
+    if sync_error(dataset) is not None:
+        st.warning(f"Google Sheets unavailable, showing stored sessions: {sync_error(dataset)}")
+        break
+with span("sessions.table") as s:
+    sessions = get_sessions(patient_id)
+    s.set(rows=len(sessions))
+
+sessions = sessions[sessions["Readings"] > 0] if not sessions.empty else sessions
+if sessions.empty:
+    st.info("No game sessions with vitals yet for this patient.")
+    st.stop()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Sessions", f"{len(sessions):,}", border=True)
+c2.metric("Median peak HR", f"{sessions['Peak HR'].median():.0f} bpm", border=True)
+c3.metric("Median SpO₂ nadir", f"{sessions['SpO2 Nadir'].median():.0f}%", border=True)
+c4.metric("Median recovery", f"{sessions['Recovery (s)'].median():.0f} s", border=True)
+
+# -------------------------
+# Exertion vs Score
+# -------------------------
+st.subheader("Exertion vs Score")
+exertion = st.selectbox("Exertion measure", ["HR Rise", "Peak HR", "SpO2 Nadir", "Recovery (s)"])
+dates = sorted(sessions["Timestamp"].dt.date.unique())
+first_date, last_date = dates[0], dates[-1]
+if len(dates) > 1:
+    first_date, last_date = st.select_slider("Sessions between", options=dates, value=(first_date, last_date))
+shown = sessions[(sessions["Timestamp"].dt.date >= first_date) & (sessions["Timestamp"].dt.date <= last_date)]
+
+fig = px.scatter(
+    shown,
+    x="Score",
+    y=exertion,
+    color=shown["Timestamp"].dt.strftime("%d-%m-%Y"),
+    hover_data={"Timestamp": "|%d-%m-%Y %H:%M:%S", "Rest HR": ":.0f", "Peak HR": ":.0f", "Recovery (s)": ":.0f"},
+)
+fig.update_layout(legend_title="Date", legend=dict(orientation="h", y=-0.3))
+plotly_chart(fig, use_container_width=True)
+
+st.subheader("Recent sessions")
+st.dataframe(
+    shown.iloc[::-1].head(200),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "Timestamp": st.column_config.DatetimeColumn("Session", format="DD-MM-YYYY HH:mm:ss"),
+        "Rest HR": st.column_config.NumberColumn("Rest HR (BPM)", format="%.0f"),
+        "Peak HR": st.column_config.NumberColumn("Peak HR (BPM)", format="%.0f"),
+        "HR Rise": st.column_config.NumberColumn("HR Rise (BPM)", format="%+.0f"),
+        "SpO2 Nadir": st.column_config.NumberColumn("SpO₂ Nadir (%)", format="%.0f"),
+        "Recovery (s)": st.column_config.NumberColumn("Recovery (s)", format="%.0f"),
+    },
+)
+
+perf_panel()
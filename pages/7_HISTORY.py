@@ -0,0 +1,73 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+import analytics
+import figures
+from downsample import CHART_WIDTH_PX
+from page_data import start_loading
+from patients import select_patient
+from perf import perf_panel, plotly_chart, span
+from pyramid import RAW_LEVEL, get_pyramid, history_window
+from sheet_sync import dataset_version, stored_frame, sync_error
+from utils import vitals_dataset
+
+HISTORY_CHARTS = {"Temperature": ("°F", [70, 105]), "Heart Rate": ("bpm", [30, 110]), "SpO2": ("%", [75, 105])}
+HISTORY_RANGES = {"Last 6 hours": pd.Timedelta(hours=6), "Last day": pd.Timedelta(days=1), "Last week": pd.Timedelta(weeks=1), "Last 30 days": pd.Timedelta(days=30), "All": None}
+
+st.title("🗓 HISTORY")
+patient_id = select_patient()
+dataset = vitals_dataset(patient_id)
+
+# Only the sync is needed here: the chart reads the rollup tiers, and raw rows only for short ranges
+start_loading(patient_id).result()
+if sync_error(dataset) is not None:
+    st.warning(f"Google Sheets unavailable, showing stored readings: {sync_error(dataset)}")
+frame = stored_frame(dataset)
+if frame.empty:
+    st.info("No readings yet for this patient.")
+    st.stop()
+
+first, last = frame["Timestamp"].iat[0], frame["Timestamp"].iat[-1]
+col1, col2 = st.columns([1, 3])
+with col1:
+    metric = st.selectbox("Vital", list(HISTORY_CHARTS))
+with col2:
+    shown = st.radio("Range", list(HISTORY_RANGES) + ["Custom"], index=2, horizontal=True)
+
+if shown == "Custom":
+    # Zooming in moves to finer tiers, down to the raw readings
+    start, end = st.slider(
+        "Visible range",
+        min_value=first.to_pydatetime(),
+        max_value=max(last, first + pd.Timedelta(minutes=1)).to_pydatetime(),
+        value=(max(first, last - pd.Timedelta(weeks=1)).to_pydatetime(), last.to_pydatetime()),
+        step=datetime.timedelta(minutes=1),
+        format="DD-MM-YYYY HH:mm",
+    )
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+else:
+    start = first if HISTORY_RANGES[shown] is None else max(first, last - HISTORY_RANGES[shown])
+    end = last
+
+unit, y_range = HISTORY_CHARTS[metric]
+window_key = (dataset, dataset_version(dataset), metric, start, end)
+with span("history.window", metric=metric) as s:
+    level, series = analytics.memoized(window_key, history_window, get_pyramid(dataset), frame, metric=metric, start=start, end=end)
+    s.set(rows=len(series), level=level)
+
+if series.empty:
+    st.warning("No readings in the selected range.")
+    st.stop()
+
+fig = figures.figure(window_key, figures.history_chart, series, level=level, metric=metric, unit=unit, y_range=y_range)
+plotly_chart(fig, use_container_width=True)
+if level == RAW_LEVEL:
+    st.caption(f"{start:%d-%m-%Y %H:%M} to {end:%d-%m-%Y %H:%M}: {len(series):,} raw readings.")
+else:
+    st.caption(
+        f"{start:%d-%m-%Y %H:%M} to {end:%d-%m-%Y %H:%M}: {len(series):,} points, one per {level} "
+        f"(the coarsest rollup that still fills {CHART_WIDTH_PX:,} px). Narrow the range for finer detail."
+    )
+
+perf_panel()
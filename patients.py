@@ -0,0 +1,68 @@
+import json
+import os
+
+import streamlit as st
+
+# -------------------------
+# Patient Registry
+# -------------------------
+# One deployment can serve many patients. The registry (a JSON list in
+# ARCREHAB_PATIENTS_FILE, default patients.json) maps each patient to where
+# their readings come from:
+#
+#   [
+#     {"id": "p01", "name": "Patient 01", "spreadsheet_id": "...", "vitals_sheet": "Sheet2", "scores_sheet": "Sheet4"},
+#     {"id": "p02", "name": "Patient 02", "source": "store"}
+#   ]
+#
+# Sheet fields that are left out fall back to the loaders' defaults. Patients
+# with "source": "store" are not synced from Google Sheets; their readings are
+# read from their partition of the local store, which another process writes.
+#
+# Without a registry file there is a single patient using the original sheet,
+# and its datasets keep their original names so existing local stores stay valid.
+
+PATIENTS_FILE = os.environ.get("ARCREHAB_PATIENTS_FILE", "patients.json")
+DEFAULT_PATIENT_ID = "default"
+
+
+def _load_registry():
+    if not os.path.exists(PATIENTS_FILE):
+        return {DEFAULT_PATIENT_ID: {"id": DEFAULT_PATIENT_ID, "name": "Patient"}}
+
+    with open(PATIENTS_FILE) as f:
+        entries = json.load(f)
+    return {str(entry["id"]): dict(entry, id=str(entry["id"]), name=entry.get("name", str(entry["id"]))) for entry in entries}
+
+
+PATIENTS = _load_registry()
+
+
+def patient_dataset(patient_id, kind):
+    # Store partition / sync dataset of one patient's data, e.g. "p01/vitals"
+    if patient_id == DEFAULT_PATIENT_ID:
+        return kind
+    return f"{patient_id}/{kind}"
+
+
+def sheet_source(patient, sheet_key, spreadsheet_id, sheet_name):
+    # (spreadsheet_id, sheet_name) for one of the patient's sheets; spreadsheet_id is None for store-only patients
+    if patient.get("source", "sheets") == "store":
+        return None, None
+    return patient.get("spreadsheet_id", spreadsheet_id), patient.get(sheet_key, sheet_name)
+
+
+def select_patient():
+    # Sidebar patient picker, remembered across pages; hidden when there is only one patient
+    patient_ids = list(PATIENTS)
+    current = st.session_state.get("patient_id")
+    if current not in PATIENTS:
+        current = patient_ids[0]
+
+    if len(patient_ids) > 1:
+        current = st.sidebar.selectbox(
+            "Patient", patient_ids, index=patient_ids.index(current),
+            format_func=lambda patient_id: PATIENTS[patient_id]["name"],
+        )
+    st.session_state["patient_id"] = current
+    return current
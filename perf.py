@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+import streamlit as st
+
+import warmup
+
+# -------------------------
+# Hot-Path Instrumentation
+# -------------------------
+# Spans time a block of work and carry a few counters (rows, payload bytes,
+# ranges). They are off unless ARCREHAB_PERF=1: span() then hands out one shared
+# no-op object and plotly_chart() calls st.plotly_chart directly, so the hooks
+# cost a function call. When on, every finished span is
+#
+#   - added to per-name totals for the process (prometheus_text() exports them),
+#   - logged as one JSON line on the "arcrehab.perf" logger,
+#   - kept in a short per-thread history that perf_panel() shows in the sidebar
+#     for the page run that produced it.
+#
+# prometheus_text() also carries the startup gauges from warmup.py: the time to
+# the first useful page and how long the server warm-up took.
+
+ENABLED = os.environ.get("ARCREHAB_PERF") == "1"
+RECENT_SPANS = 500  # per thread
+
+logger = logging.getLogger("arcrehab.perf")
+
+_TOTALS = {}
+_TOTALS_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _local():
+    if not hasattr(_LOCAL, "stack"):
+        _LOCAL.stack = []
+        _LOCAL.spans = deque(maxlen=RECENT_SPANS)
+    return _LOCAL
+
+
+class _Span:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        local = _local()
+        self.depth = len(local.stack)
+        local.stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        local = _local()
+        local.stack.pop()
+        entry = {"span": self.name, "started": self.started, "seconds": seconds, "depth": self.depth, "thread": threading.current_thread().name, **self.fields}
+        if exc_type is not None:
+            entry["error"] = exc_type.__name__
+        local.spans.append(entry)
+        _add_totals(entry)
+        logger.info(json.dumps(entry, default=str))
+        return False
+
+
+def span(name, **fields):
+    # with span("load.vitals") as s: ...; s.set(rows=len(frame))
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, fields)
+
+
+def payload_bytes(values):
+    # Size of the cell text in a Sheets response; only worth computing while instrumenting
+    return sum(len(cell) for row in values for cell in row)
+
+
+def _add_totals(entry):
+    with _TOTALS_LOCK:
+        totals = _TOTALS.setdefault(entry["span"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes": 0, "errors": 0})
+        totals["count"] += 1
+        totals["seconds"] += entry["seconds"]
+        totals["max_seconds"] = max(totals["max_seconds"], entry["seconds"])
+        totals["rows"] += int(entry.get("rows", 0))
+        totals["bytes"] += int(entry.get("bytes", 0))
+        totals["errors"] += "error" in entry
+
+
+def plotly_chart(fig, container=None, **kwargs):
+    # st.plotly_chart with serialisation time and payload size recorded
+    target = container if container is not None else st
+    if not ENABLED:
+        return target.plotly_chart(fig, **kwargs)
+
+    with span("chart.serialize", traces=len(fig.data)) as s:
+        s.set(bytes=len(fig.to_json()), rows=sum(len(trace.x) for trace in fig.data if getattr(trace, "x", None) is not None))
+    with span("chart.render", traces=len(fig.data)):
+        return target.plotly_chart(fig, **kwargs)
+
+
+# -------------------------
+# Exports
+# -------------------------
+
+def totals():
+    with _TOTALS_LOCK:
+        return {name: dict(values) for name, values in _TOTALS.items()}
+
+
+def prometheus_text():
+    # Prometheus text exposition format of the per-span totals
+    lines = []
+    metrics = [
+        ("arcrehab_span_seconds_total", "counter", "Time spent in the span", "seconds"),
+        ("arcrehab_span_calls_total", "counter", "Finished spans", "count"),
+        ("arcrehab_span_max_seconds", "gauge", "Slowest single span", "max_seconds"),
+        ("arcrehab_span_rows_total", "counter", "Rows handled in the span", "rows"),
+        ("arcrehab_span_bytes_total", "counter", "Payload bytes handled in the span", "bytes"),
+        ("arcrehab_span_errors_total", "counter", "Spans that raised", "errors"),
+    ]
+    snapshot = totals()
+    for metric, kind, help_text, key in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name in sorted(snapshot):
+            lines.append(f'{metric}{{span="{name}"}} {snapshot[name][key]}')
+
+    startup = warmup.status()
+    for metric, help_text, key in [
+        ("arcrehab_time_to_first_page_seconds", "Seconds from startup to the end of the first data page run", "first_page_seconds"),
+        ("arcrehab_warmup_seconds", "Seconds from startup to the end of the server warm-up", "warmup_seconds"),
+    ]:
+        if startup[key] is not None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {startup[key]}")
+    return "\n".join(lines) + "\n"
+
+
+def take_recent_spans():
+    # Spans finished on this thread since the last call (i.e. during this page run)
+    local = _local()
+    spans = list(local.spans)
+    local.spans.clear()
+    return spans
+
+
+def perf_panel():
+    # Sidebar table of this run's spans plus downloads of the process totals
+    warmup.page_ready()
+    if not ENABLED:
+        return
+
+    spans = take_recent_spans()
+    with st.sidebar.expander("⏱ Performance", expanded=False):
+        if spans:
+            table = pd.DataFrame(spans).sort_values("started")
+            table["span"] = ["· " * depth + name for depth, name in zip(table["depth"], table["span"])]
+            table["ms"] = (table["seconds"] * 1000).round(1)
+            columns = ["span", "ms"] + [column for column in ("rows", "bytes") if column in table]
+            st.dataframe(table[columns], hide_index=True, use_container_width=True)
+        else:
+            st.caption("No spans recorded in this run.")
+        startup = warmup.status()
+        st.caption(
+            f"First page ready {startup['first_page_seconds']:.2f}s after startup; warm-up "
+            + (f"took {startup['warmup_seconds']:.2f}s." if startup["warmup_seconds"] is not None else "still running.")
+        )
+        st.download_button("Prometheus metrics", prometheus_text, "arcrehab_metrics.txt", "text/plain")
+        st.download_button("Span totals (JSON)", lambda: json.dumps(totals(), indent=2), "arcrehab_spans.json", "application/json")
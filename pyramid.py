@@ -0,0 +1,174 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from downsample import CHART_WIDTH_PX
+from sheet_sync import add_listener, stored_frame
+
+# -------------------------
+# Time-Series Pyramid
+# -------------------------
+# Per dataset we keep rollup tiers of the readings, one per entry of
+# PYRAMID_TIERS, each a sorted array of bucket starts and a float64 array with
+# the TIER_STATS columns of every metric in turn:
+#
+#   <metric> count, <metric> sum, <metric> min, <metric> max, <next metric> ...
+#
+# The finest tier is grouped from the rows, every coarser tier from the tier
+# before it. Appended rows are rolled up on their own; each tier then regroups
+# its buckets from the update's first one on (normally only the last, still
+# open bucket) with the update and writes them over its end in place. The
+# arrays keep spare room and double when full, so an append costs what it
+# adds; only a full (re)load rebuilds the tiers.
+#
+# history_window() serves a time range from the coarsest tier that still has a
+# bucket per horizontal pixel, and from the raw readings once even the finest
+# tier is coarser than that, so a chart of months reads about as many points
+# as a chart of a day.
+
+PYRAMID_TIERS = {"1 min": "1min", "15 min": "15min", "1 hour": "1h", "1 day": "1D"}
+TIER_STATS = {"count": np.add, "sum": np.add, "min": np.fmin, "max": np.fmax}  # how buckets merge
+RAW_LEVEL = "Raw"
+
+_TRACKED = {}
+
+
+def _finest(rows, metrics, freq):
+    grouped = rows[metrics].astype("float64").groupby(rows["Timestamp"].dt.floor(freq).to_numpy(), sort=True)
+    stats = [getattr(grouped, stat)() for stat in TIER_STATS]
+    return stats[0].index.to_numpy(), np.stack([stat.to_numpy(dtype="float64") for stat in stats], axis=2).reshape(len(stats[0]), -1)
+
+
+def _rollup(index, values):
+    # Merges the tier rows that share a bucket start: (sorted bucket starts, their values)
+    order = np.argsort(index, kind="stable")
+    index, values = index[order], values[order]
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    merged = np.empty((len(starts), values.shape[1]))
+    for position, how in enumerate(TIER_STATS.values()):
+        merged[:, position::len(TIER_STATS)] = how.reduceat(values[:, position::len(TIER_STATS)], starts, axis=0)
+    return index[starts], merged
+
+
+def _tiers(rows, metrics):
+    tiers, tier = {}, None
+    for label, freq in PYRAMID_TIERS.items():
+        tier = _finest(rows, metrics, freq) if tier is None else _rollup(pd.DatetimeIndex(tier[0]).floor(freq).to_numpy(), tier[1])
+        tiers[label] = tier
+    return tiers
+
+
+def _tier(index, values, capacity=0):
+    # Tier arrays with room for `capacity` buckets
+    capacity = max(capacity, len(index))
+    tier = {"index": np.empty(capacity, dtype=index.dtype), "values": np.empty((capacity, values.shape[1])), "size": len(index)}
+    tier["index"][:len(index)] = index
+    tier["values"][:len(index)] = values
+    return tier
+
+
+def build_pyramid(frame, metrics):
+    tiers = _tiers(frame, metrics) if not frame.empty else {}
+    return {"lock": threading.Lock(), "metrics": list(metrics), "tiers": {label: _tier(*tier) for label, tier in tiers.items()}}
+
+
+def _merge_tier(tier, index, values):
+    # Regroups the tier's buckets from the update's first one on with the update and writes them over its end
+    size = tier["size"]
+    index = index.astype(tier["index"].dtype)
+    split = tier["index"][:size].searchsorted(index[0])
+    index, values = _rollup(
+        np.concatenate([tier["index"][split:size], index]), np.concatenate([tier["values"][split:size], values])
+    )
+
+    end = split + len(index)
+    if end > len(tier["index"]):
+        tier.update(_tier(tier["index"][:split], tier["values"][:split], 2 * end))
+    tier["index"][split:end] = index
+    tier["values"][split:end] = values
+    tier["size"] = end
+
+
+def extend_pyramid(pyramid, rows):
+    # Adds `rows` (later than the pyramid's, apart from a few late readings) to every tier in place
+    if rows.empty:
+        return
+    update = _tiers(rows, pyramid["metrics"])
+    with pyramid["lock"]:
+        if not pyramid["tiers"]:
+            pyramid["tiers"] = {label: _tier(*tier) for label, tier in update.items()}
+            return
+        for label, tier in pyramid["tiers"].items():
+            _merge_tier(tier, *update[label])
+
+
+def pick_level(start, end, width=CHART_WIDTH_PX):
+    # Coarsest tier with at least `width` buckets between start and end, else the raw readings
+    for label, freq in reversed(PYRAMID_TIERS.items()):
+        if (end - start) / pd.Timedelta(freq) >= width:
+            return label
+    return RAW_LEVEL
+
+
+def history_window(pyramid, frame, metric, start, end, width=CHART_WIDTH_PX):
+    # (level, frame of Timestamp, Mean, Min and Max) for `metric` between start and end
+    level = pick_level(start, end, width)
+    if level == RAW_LEVEL:
+        times = frame["Timestamp"]
+        rows = frame.iloc[times.searchsorted(start):times.searchsorted(end, side="right")]
+        values = rows[metric].to_numpy(dtype="float64")
+        return level, pd.DataFrame({"Timestamp": rows["Timestamp"].to_numpy(), "Mean": values, "Min": values, "Max": values})
+
+    with pyramid["lock"]:
+        tier = pyramid["tiers"].get(level)
+        if tier is None:
+            return level, pd.DataFrame(columns=["Timestamp", "Mean", "Min", "Max"])
+        # Include the bucket that holds `start`
+        index = pd.DatetimeIndex(tier["index"][:tier["size"]])
+        first = index.searchsorted(pd.Timestamp(start).floor(PYRAMID_TIERS[level]))
+        last = index.searchsorted(end, side="right")
+        column = pyramid["metrics"].index(metric) * len(TIER_STATS)
+        times = index[first:last].to_numpy(copy=True)
+        count, total, low, high = tier["values"][first:last, column:column + len(TIER_STATS)].T.copy()
+
+    has = count > 0
+    return level, pd.DataFrame({
+        "Timestamp": times[has],
+        "Mean": total[has] / count[has],
+        "Min": low[has],
+        "Max": high[has],
+    })
+
+
+# -------------------------
+# Pyramids maintained from the sheet sync
+# -------------------------
+
+@st.cache_resource(show_spinner=False)
+def _pyramids():
+    return {}
+
+
+def track_pyramid(dataset, metrics):
+    _TRACKED[dataset] = metrics
+
+    def on_change(frame, new_rows):
+        pyramids = _pyramids()
+        if new_rows is None or dataset not in pyramids:
+            pyramids[dataset] = build_pyramid(frame, metrics)
+        else:
+            extend_pyramid(pyramids[dataset], new_rows)
+
+    add_listener(dataset, "pyramid", on_change)
+
+
+def get_pyramid(dataset):
+    pyramids = _pyramids()
+    if dataset not in pyramids:
+        # Restoring the frame notifies the listener above, which may already build the pyramid
+        frame = stored_frame(dataset)
+        if dataset not in pyramids:
+            pyramids[dataset] = build_pyramid(frame, _TRACKED[dataset])
+    return pyramids[dataset]
@@ -0,0 +1,91 @@
+import numpy as np
+import streamlit as st
+
+from schema import date_to_key, key_to_date
+
+# -------------------------
+# Day-Partitioned Query Layer
+# -------------------------
+# Loaded frames are sorted by Timestamp, so every day is a contiguous block of
+# rows and TimeOfDay is sorted inside each block. The day index records where
+# each block starts and ends; date and hour selections become a handful of
+# searchsorted calls and row slices, so a filter costs what it returns rather
+# than a scan over the whole history.
+
+
+def build_day_index(frame):
+    keys = frame["DateKey"].to_numpy()
+    if len(keys) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {"days": empty.astype(np.int32), "starts": empty, "ends": empty}
+
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(keys)]))
+    return {"days": keys[starts], "starts": starts, "ends": ends}
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached_day_index(signature, _frame):
+    return build_day_index(_frame)
+
+
+def _signature(frame):
+    if frame.empty:
+        return (tuple(frame.columns), 0)
+    timestamps = frame["Timestamp"]
+    return (tuple(frame.columns), len(frame), timestamps.iat[0], timestamps.iat[-1])
+
+
+def _matches(index, keys, positions):
+    # Exact check of the selected blocks against the sorted keys: each block holds
+    # its day and the rows just outside it do not
+    n = len(keys)
+    starts, ends, days = index["starts"][positions], index["ends"][positions], index["days"][positions]
+    if len(days) == 0:
+        return True
+    if ends[-1] > n:
+        return False
+    before = keys[np.maximum(starts - 1, 0)]
+    after = keys[np.minimum(ends, n - 1)]
+    return bool(
+        np.all(keys[starts] == days) and np.all(keys[ends - 1] == days)
+        and np.all((starts == 0) | (before != days)) and np.all((ends == n) | (after != days))
+    )
+
+
+def day_index(frame):
+    # Offsets of each day's rows; built once per loaded frame and shared across reruns
+    return _cached_day_index(_signature(frame), frame)
+
+
+def available_dates(frame):
+    # Distinct dates (oldest first) without touching the rows
+    return list(key_to_date(day_index(frame)["days"]).date)
+
+
+def select_rows(frame, dates=None, seconds=None):
+    # Rows on `dates` (all dates when None) with TimeOfDay in the half-open range `seconds`
+    index = day_index(frame)
+    days = index["days"] if dates is None else np.intersect1d(index["days"], date_to_key(list(dates)))
+    positions = np.searchsorted(index["days"], days)
+
+    keys = frame["DateKey"].to_numpy()
+    if not _matches(index, keys, positions):
+        index = build_day_index(frame)
+        positions = np.searchsorted(index["days"], days)
+
+    starts, ends = index["starts"][positions], index["ends"][positions]
+    if seconds is not None:
+        time_of_day = frame["TimeOfDay"].to_numpy()
+        low, high = seconds
+        starts, ends = (
+            np.array([start + np.searchsorted(time_of_day[start:end], low) for start, end in zip(starts, ends)], dtype=np.int64),
+            np.array([start + np.searchsorted(time_of_day[start:end], high) for start, end in zip(starts, ends)], dtype=np.int64),
+        )
+
+    if len(starts) == 0:
+        return frame.iloc[0:0]
+    if seconds is None and len(starts) == len(index["starts"]):
+        return frame
+    return frame.iloc[np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])]
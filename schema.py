@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# Compact Frame Schema
+# -------------------------
+# The loaders keep one datetime64 Timestamp plus two integer keys derived from
+# it (DateKey: days since 1970-01-01, TimeOfDay: seconds since midnight) and
+# narrow numeric columns. Date/Time for display are derived views built only
+# for the rows being shown or exported, never stored on the frame.
+
+VITALS_SCHEMA = {
+    "Timestamp": "datetime64[ns]",
+    "DateKey": "int32",
+    "TimeOfDay": "int32",
+    "Temperature": "float32",
+    "Heart Rate": "float32",
+    "SpO2": "float32",
+}
+
+SCORES_SCHEMA = {
+    "Timestamp": "datetime64[ns]",
+    "DateKey": "int32",
+    "TimeOfDay": "int32",
+    "Score": "float32",  # one dtype for every batch, whole or fractional
+}
+
+
+def add_time_keys(df):
+    # DateKey and TimeOfDay from the canonical Timestamp, integer arithmetic only
+    ns = df["Timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    days, seconds = np.divmod(ns // 1_000_000_000, 86_400)
+    df["DateKey"] = days.astype(np.int32)
+    df["TimeOfDay"] = seconds.astype(np.int32)
+    return df
+
+
+def apply_schema(df, schema):
+    return df[list(schema)].astype(schema)
+
+
+def empty_frame(schema):
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in schema.items()})
+
+
+# -------------------------
+# Derived views
+# -------------------------
+
+def key_to_date(keys):
+    # DateKey(s) -> datetime64 midnight(s)
+    return pd.to_datetime(np.asarray(keys, dtype=np.int64), unit="D")
+
+
+def date_to_key(dates):
+    # date/datetime values -> DateKey(s)
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+def date_view(df):
+    return pd.Series(key_to_date(df["DateKey"].to_numpy()), index=df.index, name="Date")
+
+
+def date_labels(df):
+    # 'dd-mm-YYYY' labels, formatted once per distinct day and mapped onto the rows
+    keys = df["DateKey"]
+    labels = pd.Series(key_to_date(np.unique(keys)).strftime("%d-%m-%Y"), index=np.unique(keys))
+    return keys.map(labels)
+
+
+_TIME_TEXT = []
+
+
+def _time_text():
+    # "HH:MM:SS" for every second of the day, indexed by TimeOfDay; built on first use
+    if not _TIME_TEXT:
+        _TIME_TEXT.append(np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86_400)], dtype=object))
+    return _TIME_TEXT[0]
+
+
+def sheet_view(df, value_columns):
+    # Rows as they appear in the sheet: Date and Time text plus the value columns
+    view = pd.DataFrame({
+        "Date": date_labels(df),
+        "Time": _time_text()[df["TimeOfDay"].to_numpy()],
+    }, index=df.index)
+    return pd.concat([view, df[value_columns]], axis=1)
+
+
+def memory_footprint(df):
+    # (total bytes, bytes per row) of a frame, including object payloads
+    total = int(df.memory_usage(index=True, deep=True).sum())
+    return total, total / len(df) if len(df) else 0.0
@@ -0,0 +1,147 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from patients import PATIENTS
+from sheet_sync import add_listener, dataset_version, stored_frame
+from trends import get_trends, trend_rows
+from utils import vitals_dataset
+from utils2 import scores_dataset
+
+# -------------------------
+# Game Sessions
+# -------------------------
+# Every game score closes a therapy session. Its vitals are the readings from
+# SESSION_LENGTH before the score (but not before the previous score) up to the
+# score itself; the recovery runs from the score for up to RECOVERY_WINDOW (but
+# not past the next score). Windows are found with an as-of lookup of the
+# window bounds in the sorted vitals timestamps, and per session we keep:
+#
+#   Rest HR      - the heart-rate EWMA baseline (trends.py) as of the session start
+#   Peak HR      - highest heart rate during the session, HR Rise = Peak - Rest
+#   SpO2 Nadir   - lowest SpO2 during the session
+#   Recovery (s) - seconds after the score until the heart rate is back within
+#                  RECOVERY_MARGIN bpm of the resting rate (NaN if it never is)
+#
+# A session is finished once the next score exists and the vitals have passed
+# its recovery window. Finished sessions are computed once and kept; each call
+# only computes the sessions after them. A full reload of either sheet starts over.
+
+SESSION_LENGTH = pd.Timedelta(minutes=5)
+RECOVERY_WINDOW = pd.Timedelta(minutes=10)
+RECOVERY_MARGIN = 5  # bpm
+SESSION_COLUMNS = ["Timestamp", "Score", "Readings", "Rest HR", "Peak HR", "HR Rise", "SpO2 Nadir", "Recovery (s)"]
+
+
+def _segment_reduce(ufunc, values, starts, ends):
+    # ufunc over values[start:end] for ordered, non-overlapping segments; NaN for empty ones
+    if len(starts) == 0:
+        return np.empty(0)
+    bounds = np.column_stack([starts, ends]).ravel()
+    reduced = ufunc.reduceat(np.append(values, np.nan), bounds)[::2]
+    return np.where(ends > starts, reduced, np.nan)
+
+
+def _first_recovered(heart_rate, times, starts, ends, thresholds):
+    # Time of the first reading in each [start, end) at or below its threshold (NaT when none)
+    lengths = ends - starts
+    session = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(starts, lengths) + offsets
+
+    hit = heart_rate[rows] <= thresholds[session]
+    hit_sessions, first = np.unique(session[hit], return_index=True)
+    recovered = np.full(len(starts), np.datetime64("NaT"), dtype="datetime64[ns]")
+    recovered[hit_sessions] = times[rows[hit][first]]
+    return recovered
+
+
+def session_features(vitals, scores, trends, first=0):
+    # Features of the sessions closed by score rows first:, plus how many of them are finished
+    score_times = scores["Timestamp"]
+    # Bounded by the neighbouring scores; the first and last have none (NaT compares false), whatever the unit
+    previous, following = score_times.shift(1), score_times.shift(-1)
+    starts = score_times - SESSION_LENGTH
+    starts = starts.mask(starts < previous, previous).iloc[first:]
+    recovery_ends = score_times + RECOVERY_WINDOW
+    recovery_ends = recovery_ends.mask(recovery_ends > following, following).iloc[first:]
+    score_times = score_times.iloc[first:]
+
+    times = vitals["Timestamp"].to_numpy()
+    heart_rate = vitals["Heart Rate"].to_numpy(dtype="float64")
+    spo2 = vitals["SpO2"].to_numpy(dtype="float64")
+    session_start = np.searchsorted(times, starts.to_numpy(), side="right")
+    session_end = np.searchsorted(times, score_times.to_numpy(), side="right")
+    recovery_end = np.searchsorted(times, recovery_ends.to_numpy(), side="right")
+
+    # As of the session start: the baseline at the last reading before the window
+    before = vitals.index[np.maximum(session_start - 1, 0)] if len(vitals) else vitals.index[:0]
+    baseline = trend_rows(trends, before, "Heart Rate", rolling=False)["Heart Rate baseline"]
+    rest = np.where(session_start > 0, baseline.to_numpy(dtype="float64"), np.nan)
+
+    peak = _segment_reduce(np.fmax, heart_rate, session_start, session_end)
+    recovered = _first_recovered(heart_rate, times, session_end, recovery_end, rest + RECOVERY_MARGIN)
+    table = pd.DataFrame({
+        "Timestamp": score_times.to_numpy(),
+        "Score": scores["Score"].iloc[first:].to_numpy(),
+        "Readings": session_end - session_start,
+        "Rest HR": rest,
+        "Peak HR": peak,
+        "HR Rise": peak - rest,
+        "SpO2 Nadir": _segment_reduce(np.fmin, spo2, session_start, session_end),
+        "Recovery (s)": (recovered - score_times.to_numpy()) / np.timedelta64(1, "s"),
+    }).astype({"Readings": "int32", "Rest HR": "float32", "Peak HR": "float32", "HR Rise": "float32", "SpO2 Nadir": "float32", "Recovery (s)": "float32"})
+
+    has_next = np.arange(first, len(scores)) < len(scores) - 1
+    finished = has_next & (recovery_ends.to_numpy() <= times[-1]) if len(times) else np.zeros(len(table), dtype=bool)
+    # Sessions finish in order, so the finished ones come first
+    return table, len(table) if finished.all() else int(np.argmin(finished))
+
+
+# -------------------------
+# Sessions maintained per patient
+# -------------------------
+
+@st.cache_resource(show_spinner=False)
+def _sessions():
+    return {}
+
+
+def _reset(patient_id):
+    def on_change(frame, new_rows):
+        # Appends keep the finished sessions; anything else starts over
+        if new_rows is None:
+            _sessions().pop(patient_id, None)
+    return on_change
+
+
+for _patient in PATIENTS.values():
+    add_listener(vitals_dataset(_patient["id"]), "sessions", _reset(_patient["id"]))
+    add_listener(scores_dataset(_patient["id"]), "sessions", _reset(_patient["id"]))
+
+
+def get_sessions(patient_id):
+    # One row per game session (SESSION_COLUMNS), oldest first
+    engine = _sessions().setdefault(patient_id, {
+        "lock": threading.Lock(),
+        "finished": pd.DataFrame(columns=SESSION_COLUMNS),
+        "table": None,
+        "versions": None,
+    })
+    vitals_ds, scores_ds = vitals_dataset(patient_id), scores_dataset(patient_id)
+
+    with engine["lock"]:
+        versions = (dataset_version(vitals_ds), dataset_version(scores_ds))
+        if engine["versions"] != versions:
+            vitals, scores = stored_frame(vitals_ds), stored_frame(scores_ds)
+            if vitals.empty or scores.empty:
+                engine["table"] = engine["finished"]
+            else:
+                done = len(engine["finished"])
+                pending, finished = session_features(vitals, scores, get_trends(vitals_ds), done)
+                engine["finished"] = pd.concat([engine["finished"], pending.iloc[:finished]], ignore_index=True) if done else pending.iloc[:finished]
+                engine["table"] = pd.concat([engine["finished"], pending.iloc[finished:]], ignore_index=True)
+            engine["versions"] = versions
+        return engine["table"]
@@ -0,0 +1,348 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import pandas as pd
+import streamlit as st
+
+import perf
+import sheets_client
+import store
+from perf import span
+
+# -------------------------
+# Incremental Sheet Sync
+# -------------------------
+# Every synced sheet keeps its parsed frame in process memory together with a
+# cursor: the sheet row of the last ingested row and the last ingested
+# timestamp. A sync only requests the rows from the cursor onwards (e.g.
+# "Sheet2!A{n}:E").
+#
+# To notice edits to rows already ingested, the raw rows are hashed in blocks
+# of CHECK_BLOCK_ROWS. The delta range starts at the last, incomplete block, so
+# its rows come back with the new ones and are checked against their hash, and
+# every sync also fetches the first block and one more, rotating through the
+# sheet. A block that no longer matches means earlier rows were edited or
+# deleted, and the sheet is re-read in full.
+#
+# The local store (store.py) is the system of record: the frame and cursor are
+# restored from it on process start, deltas are appended to it and a full
+# resync replaces it.
+#
+# All registered sheets of a spreadsheet are synced together with a single
+# batchGet, so loading vitals also brings the scores up to date.
+#
+# Modules that maintain data derived from a sheet (e.g. daily rollups) subscribe
+# with add_listener and are handed only the newly ingested rows.
+#
+# Each dataset has a TTL: within it a synced dataset counts as fresh and is not
+# fetched again (failed syncs also wait for the TTL before retrying). Every
+# change bumps the dataset version, which the loaders use as their cache key.
+#
+# Different spreadsheets (e.g. one per patient) are fetched concurrently, at
+# most sheets_client.POOL_SIZE at a time. Datasets registered without a
+# spreadsheet are local-only: once their TTL runs out they are re-read from
+# the store, where another process writes them.
+
+DEFAULT_TTL = 60  # seconds
+CHECK_BLOCK_ROWS = 256  # sheet rows per integrity hash
+
+_SHEETS = {}
+_LISTENERS = {}
+
+
+def register_sheet(dataset, spreadsheet_id, sheet_name, last_column, parse, ttl=DEFAULT_TTL):
+    # spreadsheet_id=None registers a local-only dataset read from the store
+    _SHEETS[dataset] = {
+        "spreadsheet_id": spreadsheet_id,
+        "sheet_name": sheet_name,
+        "last_column": last_column,
+        "parse": parse,
+        "ttl": ttl,
+    }
+
+
+def add_listener(dataset, name, listener):
+    # listener(frame, new_rows) runs after every change; new_rows is None when the whole frame was (re)loaded
+    _LISTENERS.setdefault(dataset, {})[name] = listener
+
+
+def _changed(state, dataset, frame, new_rows=None):
+    state["version"] += 1
+    for name, listener in list(_LISTENERS.get(dataset, {}).items()):
+        with span(f"listener.{name}", dataset=dataset, rows=len(frame if new_rows is None else new_rows)):
+            listener(frame, new_rows)
+
+
+@st.cache_resource(show_spinner=False)
+def _sync_states():
+    return {}
+
+
+def _get_state(dataset):
+    states = _sync_states()
+    state = states.get(dataset)
+    if state is None:
+        state = states.setdefault(dataset, {
+            "lock": threading.Lock(),
+            "frame": None,
+            "headers": None,
+            "last_row": 0,
+            "blocks": [],
+            "tail_hash": None,
+            "probe": 0,
+            "last_timestamp": None,
+            "synced_at": None,
+            "error": None,
+            "version": 0,
+        })
+    return state
+
+
+def _restore(state, dataset):
+    if dataset in _SHEETS and _SHEETS[dataset]["spreadsheet_id"] is None:
+        _reload_local(state, dataset)
+        return
+
+    manifest = store.read_manifest(dataset)
+    if manifest is None:
+        state["frame"] = pd.DataFrame()
+        _changed(state, dataset, state["frame"])
+        return
+
+    # Parts of an append the manifest never committed would duplicate the rows the next delta brings again
+    store.discard_after(dataset, manifest.get("last_row", 0))
+    frame = store.read(dataset)
+    last_timestamp = manifest.get("last_timestamp")
+    state.update(
+        frame=frame,
+        headers=manifest.get("headers"),
+        last_row=manifest.get("last_row", 0),
+        blocks=manifest.get("blocks", []),
+        tail_hash=manifest.get("tail_hash"),
+        last_timestamp=pd.Timestamp(last_timestamp) if last_timestamp else None,
+    )
+    _changed(state, dataset, frame)
+
+
+def _reload_local(state, dataset):
+    frame = store.read(dataset)
+    previous = state["frame"]
+    if previous is not None and len(previous) == len(frame) and (
+        frame.empty or previous["Timestamp"].iat[-1] == frame["Timestamp"].iat[-1]
+    ):
+        return
+    state.update(frame=frame, last_timestamp=frame["Timestamp"].max() if not frame.empty else None)
+    _changed(state, dataset, frame)
+
+
+def _manifest(state):
+    last_timestamp = state["last_timestamp"]
+    return {
+        "headers": state["headers"],
+        "last_row": state["last_row"],
+        "blocks": state["blocks"],
+        "tail_hash": state["tail_hash"],
+        "last_timestamp": last_timestamp.isoformat() if last_timestamp is not None else None,
+    }
+
+
+def _full_range(spec):
+    return f"{spec['sheet_name']}!A1:{spec['last_column']}"
+
+
+def _tail_row(state):
+    # Sheet row of the first row in the incomplete block (row 1 holds the headers)
+    return len(state["blocks"]) * CHECK_BLOCK_ROWS + 2
+
+
+def _delta_range(spec, state):
+    return f"{spec['sheet_name']}!A{_tail_row(state)}:{spec['last_column']}"
+
+
+def _block_range(spec, block):
+    first = block * CHECK_BLOCK_ROWS + 2
+    return f"{spec['sheet_name']}!A{first}:{spec['last_column']}{first + CHECK_BLOCK_ROWS - 1}"
+
+
+def _block_hash(rows):
+    text = "\n".join("\x1f".join(map(str, row)) for row in rows)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def _hashes(rows):
+    # (hashes of the complete blocks, hash of the incomplete rest) of `rows`, which start at a block boundary
+    complete = len(rows) - len(rows) % CHECK_BLOCK_ROWS
+    blocks = [_block_hash(rows[start:start + CHECK_BLOCK_ROWS]) for start in range(0, complete, CHECK_BLOCK_ROWS)]
+    return blocks, _block_hash(rows[complete:])
+
+
+def _probe_blocks(state):
+    # The first complete block and one more, a different one every sync
+    count = len(state["blocks"])
+    if not count:
+        return []
+    state["probe"] += 1
+    return sorted({0, state["probe"] % count})
+
+
+def _parse_rows(rows, headers, parse):
+    if not rows:
+        return pd.DataFrame()
+    with span("sheets.parse", rows=len(rows)):
+        return parse(pd.DataFrame(rows, columns=headers))
+
+
+def _apply_full(state, dataset, spec, values):
+    state["blocks"] = []
+    if not values:
+        state.update(frame=pd.DataFrame(), headers=None, last_row=0, tail_hash=None, last_timestamp=None)
+    else:
+        headers, data = values[0], values[1:]
+        frame = _parse_rows(data, headers, spec["parse"])
+        state["blocks"], state["tail_hash"] = _hashes(data)
+        state.update(
+            frame=frame,
+            headers=headers,
+            last_row=len(values),
+            last_timestamp=frame["Timestamp"].max() if not frame.empty else None,
+        )
+
+    store.replace(dataset, state["frame"], _manifest(state))
+    _changed(state, dataset, state["frame"])
+
+
+def _apply_delta(state, dataset, spec, values, probes):
+    # A block of ingested rows changed -> earlier rows were edited or deleted, resync everything
+    tail_rows = state["last_row"] - _tail_row(state) + 1
+    if _block_hash(values[:tail_rows]) != state["tail_hash"]:
+        return False
+    if any(_block_hash(rows) != state["blocks"][block] for block, rows in probes):
+        return False
+
+    new_rows = values[tail_rows:]
+    if not new_rows:
+        return True
+
+    # Nothing in `state` moves until the rows are in the store: a failed write leaves the
+    # cursor where it was, and the next sync fetches the same rows again
+    parsed = _parse_rows(new_rows, state["headers"], spec["parse"])
+    blocks, tail_hash = _hashes(values)
+    if not parsed.empty:
+        store.append(dataset, parsed, first_row=state["last_row"] + 1)
+
+    state["blocks"].extend(blocks)
+    state.update(tail_hash=tail_hash, last_row=state["last_row"] + len(new_rows))
+    if not parsed.empty:
+        frame = state["frame"]
+        frame = parsed if frame.empty else pd.concat([frame, parsed], ignore_index=True)
+
+        # Readings normally arrive in order; only re-sort when the device clock says otherwise
+        last_timestamp = state["last_timestamp"]
+        resorted = last_timestamp is not None and parsed["Timestamp"].min() < last_timestamp
+        if resorted:
+            frame = frame.sort_values("Timestamp", kind="stable", ignore_index=True)
+
+        state["frame"] = frame
+        state["last_timestamp"] = frame["Timestamp"].max()
+        _changed(state, dataset, frame, None if resorted else parsed)
+
+    store.write_manifest(dataset, _manifest(state))
+    return True
+
+
+def _fetch(spreadsheet_id, ranges):
+    with span("sheets.fetch", ranges=len(ranges)) as s:
+        results = sheets_client.batch_get_values(spreadsheet_id, ranges)
+        if perf.ENABLED:
+            s.set(rows=sum(len(values) for values in results), bytes=sum(perf.payload_bytes(values) for values in results))
+    return results
+
+
+def _sync_spreadsheet(spreadsheet_id, jobs):
+    # First pass: one batch with a delta range and the check blocks per known sheet, a full range otherwise
+    probes = [[] if state["headers"] is None else _probe_blocks(state) for _, _, state in jobs]
+    ranges = []
+    for (dataset, spec, state), blocks in zip(jobs, probes):
+        ranges.append(_full_range(spec) if state["headers"] is None else _delta_range(spec, state))
+        ranges.extend(_block_range(spec, block) for block in blocks)
+    results = iter(_fetch(spreadsheet_id, ranges))
+
+    resync = []
+    for (dataset, spec, state), blocks in zip(jobs, probes):
+        values = next(results)
+        checked = [(block, next(results)) for block in blocks]
+        if state["headers"] is None:
+            _apply_full(state, dataset, spec, values)
+        elif not _apply_delta(state, dataset, spec, values, checked):
+            resync.append((dataset, spec, state))
+
+    # Second pass only for sheets whose earlier rows were edited
+    if resync:
+        results = _fetch(spreadsheet_id, [_full_range(spec) for _, spec, _ in resync])
+        for (dataset, spec, state), values in zip(resync, results):
+            _apply_full(state, dataset, spec, values)
+
+
+def _run_sync(spreadsheet_id, jobs):
+    try:
+        _sync_spreadsheet(spreadsheet_id, jobs)
+        error = None
+    except Exception as e:
+        error = e
+    for _, _, state in jobs:
+        state["synced_at"] = time.monotonic()
+        state["error"] = error
+
+
+def sync_sheets(datasets=None, force=False):
+    # Brings stale datasets up to date; errors are recorded per dataset (see sync_error), not raised.
+    # Datasets that were never registered (their loader module is not imported) are skipped.
+    datasets = sorted(_SHEETS if datasets is None else set(datasets) & set(_SHEETS))
+    jobs = [(dataset, _SHEETS[dataset], _get_state(dataset)) for dataset in datasets]
+
+    with ExitStack() as stack:
+        # Locks are always taken in dataset order so concurrent syncs cannot deadlock
+        for _, _, state in jobs:
+            stack.enter_context(state["lock"])
+
+        now = time.monotonic()
+        by_spreadsheet = {}
+        for dataset, spec, state in jobs:
+            if state["frame"] is None:
+                _restore(state, dataset)
+            if not force and state["synced_at"] is not None and now - state["synced_at"] < spec["ttl"]:
+                continue
+            if spec["spreadsheet_id"] is None:
+                _reload_local(state, dataset)
+                state["synced_at"] = time.monotonic()
+                continue
+            by_spreadsheet.setdefault(spec["spreadsheet_id"], []).append((dataset, spec, state))
+
+        if len(by_spreadsheet) == 1:
+            _run_sync(*next(iter(by_spreadsheet.items())))
+        elif by_spreadsheet:
+            with ThreadPoolExecutor(max_workers=sheets_client.POOL_SIZE, thread_name_prefix="sheet-sync") as pool:
+                list(pool.map(_run_sync, by_spreadsheet.keys(), by_spreadsheet.values()))
+
+        return {dataset: state["frame"] for dataset, _, state in jobs}
+
+
+def sync_error(dataset):
+    return _get_state(dataset)["error"]
+
+
+def dataset_version(dataset):
+    return _get_state(dataset)["version"]
+
+
+def stored_frame(dataset):
+    # Last known frame without touching the network (used when Sheets is unavailable)
+    state = _get_state(dataset)
+
+    with state["lock"]:
+        if state["frame"] is None:
+            _restore(state, dataset)
+        return state["frame"]
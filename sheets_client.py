@@ -0,0 +1,96 @@
+import queue
+
+import streamlit as st
+
+# -------------------------
+# Shared Google Sheets Client
+# -------------------------
+# Credentials and the discovery service are built once per process. Requests
+# are executed on a small pool of authorized HTTP transports that all share
+# the same credentials, so the access token is only minted again when it
+# expires and connections are reused between loads.
+#
+# The Google client libraries are only imported when the client is first
+# built, so pages served from the local store (or a fake) never load them.
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+POOL_SIZE = 4
+HTTP_TIMEOUT = 30
+NUM_RETRIES = 2
+
+_OVERRIDE = {"client": None}
+
+
+def _load_credentials():
+    from google.oauth2.service_account import Credentials
+
+    # Read credentials from Streamlit secrets
+    service_account_info = dict(st.secrets["google_service_account"])
+
+    # Fix multiline private key if necessary
+    if isinstance(service_account_info['private_key'], str) and "\\n" in service_account_info['private_key']:
+        service_account_info['private_key'] = service_account_info['private_key'].replace("\\n", "\n")
+
+    return Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+
+
+@st.cache_resource(show_spinner=False)
+def get_sheets_client():
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build
+
+    creds = _load_credentials()
+    transports = queue.LifoQueue()
+    for _ in range(POOL_SIZE):
+        transports.put(AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT)))
+
+    # Uses the discovery document bundled with googleapiclient, no network fetch
+    http = transports.get()
+    service = build("sheets", "v4", http=http, cache_discovery=False)
+    transports.put(http)
+
+    return {"service": service, "transports": transports}
+
+
+def use_service(service):
+    # Route every request through `service` instead of Google Sheets (e.g. the local fake in
+    # benchmarks/fake_sheets.py); None switches back
+    if service is None:
+        _OVERRIDE["client"] = None
+        return
+    transports = queue.LifoQueue()
+    for _ in range(POOL_SIZE):
+        transports.put(None)
+    _OVERRIDE["client"] = {"service": service, "transports": transports}
+
+
+def _client():
+    return _OVERRIDE["client"] or get_sheets_client()
+
+
+def warm_up():
+    # Builds the shared client ahead of the first request
+    _client()
+
+
+def _execute(request):
+    transports = _client()["transports"]
+    http = transports.get()
+    try:
+        return request.execute(http=http, num_retries=NUM_RETRIES)
+    finally:
+        transports.put(http)
+
+
+def get_values(spreadsheet_id, cell_range):
+    sheet = _client()["service"].spreadsheets()
+    result = _execute(sheet.values().get(spreadsheetId=spreadsheet_id, range=cell_range))
+    return result.get("values", [])
+
+
+def batch_get_values(spreadsheet_id, ranges):
+    # One round trip for several ranges; results come back in request order
+    sheet = _client()["service"].spreadsheets()
+    result = _execute(sheet.values().batchGet(spreadsheetId=spreadsheet_id, ranges=list(ranges)))
+    return [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from perf import span
+
+# -------------------------
+# Local Columnar Store
+# -------------------------
+# Cleaned frames are persisted as Parquet files partitioned by reading date:
+#
+#   data_store/<dataset>/date=YYYY-MM-DD/part-<ns>[-r<row>].parquet
+#   data_store/<dataset>/_sync.json      (sync cursor, see sheet_sync.py)
+#
+# Appends add one part file per touched date; a date partition is compacted
+# into a single file once it collects too many parts.
+#
+# A synced append is written before the manifest that moves the cursor past
+# it, so its parts carry the sheet row of their first row ("-r<row>"). Parts
+# beyond the manifest's last row were left by a crash in between; discard_after
+# removes them before the store is read, and the rows are fetched again.
+
+STORE_DIR = os.environ.get("ARCREHAB_STORE_DIR", "data_store")
+STORE_SCHEMA_VERSION = 4
+MAX_PARTS_PER_DATE = 16
+MANIFEST_NAME = "_sync.json"
+
+
+def dataset_dir(dataset):
+    return os.path.join(STORE_DIR, dataset)
+
+
+def _partition_dirs(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if name.startswith("date=") and os.path.isdir(os.path.join(root, name))
+    )
+
+
+def _part_files(partition):
+    return sorted(
+        os.path.join(partition, name) for name in os.listdir(partition)
+        if name.endswith(".parquet")
+    )
+
+
+def _write_table(table, path):
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _compact(partition):
+    parts = _part_files(partition)
+    if len(parts) <= MAX_PARTS_PER_DATE:
+        return
+    table = pa.concat_tables([pq.read_table(p, memory_map=True) for p in parts], promote_options="permissive")
+    _write_table(table, os.path.join(partition, f"part-{time.time_ns()}.parquet"))
+    for p in parts:
+        os.remove(p)
+
+
+def _part_row(path):
+    # Sheet row tag of a part file, None for untagged parts
+    stem = os.path.basename(path)[:-len(".parquet")]
+    _, tag, row = stem.rpartition("-r")
+    return int(row) if tag and row.isdigit() else None
+
+
+def _write_partitions(root, frame, compact, first_row=None):
+    if frame.empty:
+        return
+    suffix = "" if first_row is None else f"-r{first_row}"
+    day = frame["Timestamp"].dt.normalize()
+    for key, rows in frame.groupby(day, sort=True):
+        partition = os.path.join(root, f"date={key:%Y-%m-%d}")
+        os.makedirs(partition, exist_ok=True)
+        # Compact before adding the part, so a part not yet covered by the manifest stays on its own
+        if compact:
+            _compact(partition)
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        _write_table(table, os.path.join(partition, f"part-{time.time_ns()}{suffix}.parquet"))
+
+
+def append(dataset, frame, first_row=None):
+    # first_row: sheet row of the frame's first row, for appends the manifest commits afterwards
+    with span("store.append", dataset=dataset, rows=len(frame)):
+        _write_partitions(dataset_dir(dataset), frame, compact=True, first_row=first_row)
+
+
+def discard_after(dataset, last_row):
+    # Removes parts starting beyond `last_row`: written, but never committed by a manifest
+    for partition in _partition_dirs(dataset_dir(dataset)):
+        for path in _part_files(partition):
+            row = _part_row(path)
+            if row is not None and row > last_row:
+                os.remove(path)
+
+
+def replace(dataset, frame, manifest):
+    with span("store.replace", dataset=dataset, rows=len(frame)):
+        _replace(dataset, frame, manifest)
+
+
+def _replace(dataset, frame, manifest):
+    # Build the new copy next to the old one and swap directories at the end
+    root = dataset_dir(dataset)
+    staging = root + ".staging"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    _write_partitions(staging, frame, compact=False)
+    _write_manifest(staging, manifest)
+
+    retired = root + ".old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.isdir(root):
+        os.replace(root, retired)
+    os.replace(staging, root)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def read(dataset):
+    with span("store.read", dataset=dataset) as s:
+        frame = _read(dataset)
+        s.set(rows=len(frame))
+    return frame
+
+
+def _read(dataset):
+    root = dataset_dir(dataset)
+    files = [p for partition in _partition_dirs(root) for p in _part_files(partition)]
+    if not files:
+        return pd.DataFrame()
+
+    table = pa.concat_tables([pq.read_table(p, memory_map=True) for p in files], promote_options="permissive")
+    frame = table.to_pandas()
+    if not frame["Timestamp"].is_monotonic_increasing:
+        frame = frame.sort_values("Timestamp", kind="stable", ignore_index=True)
+    return frame
+
+
+def _write_manifest(root, manifest):
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, MANIFEST_NAME)
+    # Written to a temporary file and renamed over the old one, so readers see either manifest whole
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(dict(manifest, schema_version=STORE_SCHEMA_VERSION), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_manifest(dataset, manifest):
+    _write_manifest(dataset_dir(dataset), manifest)
+
+
+def read_manifest(dataset):
+    path = os.path.join(dataset_dir(dataset), MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("schema_version") != STORE_SCHEMA_VERSION:
+        return None
+    return manifest
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The modules read their store directory and patients file on import: point them at a scratch
+# directory (no patients file means the single default patient) before any test imports them
+os.environ["ARCREHAB_STORE_DIR"] = tempfile.mkdtemp(prefix="arcrehab-tests-")
+os.environ["ARCREHAB_PATIENTS_FILE"] = os.path.join(os.environ["ARCREHAB_STORE_DIR"], "no-patients.json")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
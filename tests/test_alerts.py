@@ -0,0 +1,188 @@
+import queue
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alerts
+from alerts import ALERT_RULES, episode_ends, evaluate_rules, set_alert_sender, smtp_sender
+
+SPO2_DROP = next(rule for rule in ALERT_RULES if rule["id"] == "spo2_drop")
+
+
+def _vitals(n, seed=0):
+    # Random walks across every rule's limits, with some gaps longer than the rate window
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([5, 5, 5, 20, 45, 90], n)
+    return pd.DataFrame({
+        "Timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.cumsum(gaps), "s"),
+        "Temperature": (98.5 + np.cumsum(rng.normal(0, 0.2, n))).clip(96, 102).round(1),
+        "Heart Rate": (80 + np.cumsum(rng.normal(0, 3, n))).clip(45, 130).round(),
+        "SpO2": (96 + np.cumsum(rng.normal(0, 1.5, n))).clip(85, 100).round(),
+    })
+
+
+def _readings(seconds, spo2):
+    return pd.DataFrame({
+        "Timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(seconds, "s"),
+        "Temperature": 98.0,
+        "Heart Rate": 80.0,
+        "SpO2": np.asarray(spo2, dtype="float64"),
+    })
+
+
+def _events(events):
+    return sorted(zip(events["Key"], events["Value"]))
+
+
+def _in_batches(frame, size, rules=ALERT_RULES):
+    carry, found = {}, []
+    for start in range(0, len(frame), size):
+        found.append(evaluate_rules(frame.iloc[start:start + size], carry, rules))
+    return pd.concat(found, ignore_index=True)
+
+
+# -------------------------
+# Incremental evaluation
+# -------------------------
+
+def test_sample_breaches_every_rule():
+    assert set(evaluate_rules(_vitals(2000), {})["Rule"]) == {rule["id"] for rule in ALERT_RULES}
+
+
+@pytest.mark.parametrize("rows, size", [(400, 1), (2000, 7), (2000, 100), (2000, 1999)])
+def test_batches_raise_the_events_of_one_pass(rows, size):
+    frame = _vitals(rows)
+    assert _events(_in_batches(frame, size)) == _events(evaluate_rules(frame, {}))
+
+
+def test_an_ongoing_episode_raises_one_event():
+    frame = _readings(np.arange(10) * 5, [97, 97, 90, 90, 90, 90, 90, 90, 97, 97])
+    rules = [rule for rule in ALERT_RULES if rule["id"] == "spo2_low"]
+    assert len(_in_batches(frame, 2, rules)) == len(evaluate_rules(frame, {}, rules)) == 1
+
+
+def test_sustained_breach_across_batches_fires_once_from_its_start():
+    rule = next(rule for rule in ALERT_RULES if rule["kind"] == "sustained")
+    seconds = np.arange(60) * 5
+    frame = _readings(seconds, 97).assign(**{"Heart Rate": np.where((seconds >= 20) & (seconds < 250), 110.0, 80.0)})
+    events = _in_batches(frame, 3, [rule])
+    assert events["Timestamp"].tolist() == [pd.Timestamp("2024-01-01 00:00:20")]
+
+
+# -------------------------
+# Rate-of-change window
+# -------------------------
+
+def test_rate_compares_only_readings_within_the_window():
+    # 98 -> 93 within 60 s is a drop; the same fall across a gap longer than the window is not
+    assert len(evaluate_rules(_readings([0, 60], [98, 93]), {}, [SPO2_DROP])) == 1
+    assert evaluate_rules(_readings([0, 61], [98, 93]), {}, [SPO2_DROP]).empty
+
+
+def test_rate_carry_keeps_only_readings_a_later_window_reaches():
+    carry = {}
+    evaluate_rules(_readings([0, 30], [98, 96]), carry, [SPO2_DROP])
+    # At 80 s the 98 from 0 s is out of reach and the 96 from 30 s is only 3 points higher
+    assert evaluate_rules(_readings([80], [93]), carry, [SPO2_DROP]).empty
+    assert carry["spo2_drop"]["context"]["Timestamp"].tolist() == [pd.Timestamp("2024-01-01 00:00:30"), pd.Timestamp("2024-01-01 00:01:20")]
+    # At 85 s the carried 96 is 4 points higher
+    assert len(evaluate_rules(_readings([85], [92]), carry, [SPO2_DROP])) == 1
+
+
+# -------------------------
+# Episode ends
+# -------------------------
+
+def test_episode_ends_at_the_last_breaching_reading():
+    frame = _readings(np.arange(8) * 5, [97, 90, 90, 90, 97, 97, 91, 91])
+    events = evaluate_rules(frame, {}, [rule for rule in ALERT_RULES if rule["id"] == "spo2_low"])
+    ends = episode_ends(events, frame)
+    # The first episode clears at 20 s; the second is still open and runs to the last reading
+    assert ends.tolist() == [pd.Timestamp("2024-01-01 00:00:15"), pd.Timestamp("2024-01-01 00:00:35")]
+
+
+def test_episode_ends_match_for_every_rule():
+    frame = _vitals(1500, seed=1)
+    events = evaluate_rules(frame, {})
+    ends = episode_ends(events, frame)
+    assert (ends >= events["Timestamp"]).all()
+    for rule in ALERT_RULES:
+        if rule["kind"] == "sustained":
+            continue
+        # Every reading of a threshold or rate episode between its event and its end is a hit
+        hits = pd.Series(alerts._hit_mask(rule, frame), index=frame["Timestamp"])
+        for start, end in zip(events["Timestamp"][events["Rule"] == rule["id"]], ends[events["Rule"] == rule["id"]]):
+            assert hits[start:end].all()
+
+
+# -------------------------
+# Notifications through a local SMTP stand-in
+# -------------------------
+
+class _SMTPStandIn(socketserver.StreamRequestHandler):
+    # Just enough of RFC 5321 for smtplib: every message received goes on server.messages
+    def handle(self):
+        self.wfile.write(b"220 stand-in ready\r\n")
+        data = None
+        for line in self.rfile:
+            if data is not None:
+                if line == b".\r\n":
+                    self.server.messages.put(message_from_bytes(b"".join(data), policy=policy.default))
+                    data = None
+                    self.wfile.write(b"250 queued\r\n")
+                else:
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                continue
+            command = line[:4].upper()
+            if command == b"DATA":
+                data = []
+                self.wfile.write(b"354 go ahead\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("localhost", 0), _SMTPStandIn)
+    server.daemon_threads = True
+    server.messages = queue.Queue()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_smtp_sender_mails_every_event(smtp_server):
+    events = evaluate_rules(_readings([0, 5, 10], [97, 90, 97]), {}).assign(Patient="Ward 3")
+    smtp_sender("localhost", smtp_server.server_address[1], "alerts@example.org", ["nurse@example.org"])(events)
+
+    message = smtp_server.messages.get(timeout=5)
+    assert message["To"] == "nurse@example.org"
+    assert message["Subject"] == f"🚨 {len(events)} vitals alert(s) for Ward 3"
+    assert "Low SpO2 (SpO2: 90)" in message.get_content()
+
+
+def test_new_events_are_sent_in_the_background(smtp_server):
+    set_alert_sender(smtp_sender("localhost", smtp_server.server_address[1], "alerts@example.org", ["nurse@example.org"]))
+    try:
+        now = pd.Timestamp.now().floor("s")
+        rows = _readings([0, 5], [97, 90]).assign(Timestamp=[now - pd.Timedelta(seconds=5), now])
+        alerts._ingest("alerts-test", "Ward 3", rows, reset=True)
+        message = smtp_server.messages.get(timeout=5)
+        # 97 -> 90 is both below the SpO2 limit and a drop of more than 4 points
+        assert message["Subject"] == "🚨 2 vitals alert(s) for Ward 3"
+
+        # The same episode again is already in the log and is not sent twice
+        alerts._ingest("alerts-test", "Ward 3", rows, reset=True)
+        time.sleep(0.5)
+        assert smtp_server.messages.empty()
+    finally:
+        set_alert_sender(None)
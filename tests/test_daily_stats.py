@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from daily_stats import SKETCH_DECIMALS, build_rollup, daily_summary, merge_rollups, summarize_days
+
+METRICS = ["Temperature", "Heart Rate"]
+
+
+def _vitals(n, seed=0, start="2024-01-01"):
+    # Readings every 7 minutes, so a day holds an odd or an even count depending on where it starts
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Timestamp": pd.Timestamp(start) + pd.to_timedelta(np.arange(n) * 420, "s"),
+        "Temperature": rng.normal(98.4, 0.6, n).round(3),
+        "Heart Rate": rng.normal(78, 9, n).round(1),
+    })
+    # Some readings are missing a metric
+    frame.loc[rng.random(n) < 0.05, "Heart Rate"] = np.nan
+    return frame
+
+
+def _expected(frame, by):
+    long = frame.assign(Date=frame["Timestamp"].dt.normalize()).melt(
+        id_vars=["Timestamp", "Date"], var_name="Metric", value_name="Value"
+    ).dropna(subset=["Value"])
+    grouped = long.groupby(by)["Value"]
+    expected = grouped.agg(["count", "sum", "mean", "std", "max", "min"])
+    # The sketch keeps values at SKETCH_DECIMALS, so the median is exact at that resolution
+    expected["median"] = grouped.agg(lambda values: np.median(values.round(SKETCH_DECIMALS)))
+    return expected
+
+
+def _compare(summary, expected, by):
+    summary = summary.set_index(by).sort_index()
+    expected = expected.sort_index()
+    assert summary.index.equals(expected.index)
+    assert summary["count"].tolist() == expected["count"].tolist()
+    for column in ["sum", "mean", "median", "std", "max", "min"]:
+        np.testing.assert_allclose(summary[column].to_numpy(dtype="float64"), expected[column].to_numpy(dtype="float64"), rtol=1e-9)
+
+
+# -------------------------
+# Summaries from the rollup
+# -------------------------
+
+def test_daily_summary_matches_the_raw_readings():
+    frame = _vitals(1000)
+    summary = daily_summary(build_rollup(frame, METRICS))
+    counts = summary.groupby("Date")["count"].max()
+    # Both parities of the median are covered
+    assert (counts % 2 == 0).any() and (counts % 2 == 1).any()
+    _compare(summary, _expected(frame, ["Date", "Metric"]), ["Date", "Metric"])
+
+
+@pytest.mark.parametrize("days", [1, 3])
+def test_summarize_days_merges_the_chosen_days(days):
+    frame = _vitals(1000, seed=1)
+    dates = frame["Timestamp"].dt.normalize().unique()[1:1 + days]
+    chosen = frame[frame["Timestamp"].dt.normalize().isin(dates)]
+    _compare(summarize_days(build_rollup(frame, METRICS), dates), _expected(chosen, ["Metric"]), ["Metric"])
+
+
+def test_summaries_of_an_empty_rollup():
+    rollup = build_rollup(_vitals(0), METRICS)
+    assert daily_summary(rollup).empty
+    assert summarize_days(rollup, [pd.Timestamp("2024-01-01")]).empty
+
+
+# -------------------------
+# Incremental rollups
+# -------------------------
+
+@pytest.mark.parametrize("size", [50, 333])
+def test_merged_batches_equal_one_rollup(size):
+    frame = _vitals(1200, seed=2)
+    # A late batch reaching back to earlier days is spliced into their rows
+    batches = [frame.iloc[start:min(start + size, 1000)] for start in range(0, 1000, size)] + [frame.iloc[1000:]]
+    batches[1], batches[-1] = batches[-1], batches[1]
+
+    rollup = build_rollup(batches[0], METRICS)
+    for batch in batches[1:]:
+        rollup = merge_rollups(rollup, build_rollup(batch, METRICS))
+    full = build_rollup(frame, METRICS)
+
+    for table, keys in [("stats", ["Date", "Metric"]), ("sketch", ["Date", "Metric", "Value"])]:
+        assert rollup[table][keys].equals(full[table][keys])
+        numbers = [column for column in full[table].columns if column not in keys]
+        np.testing.assert_allclose(rollup[table][numbers].to_numpy(dtype="float64"), full[table][numbers].to_numpy(dtype="float64"), rtol=1e-9)
+    assert rollup["latest"].equals(full["latest"])
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import MIN_POINTS_PER_LINE, downsample_lines, lttb_indices
+
+
+def _signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype="float64"), np.cumsum(rng.normal(0, 1, n))
+
+
+def _lines(n, names, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(n) * 5, "s"),
+        "Line": rng.choice(names, n),
+        "Value": np.cumsum(rng.normal(0, 1, n)),
+    })
+
+
+# -------------------------
+# LTTB
+# -------------------------
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (1000, 50), (10_007, 1400)])
+def test_lttb_keeps_the_ends_and_one_point_per_bucket(n, n_out):
+    x, y = _signal(n)
+    picked = lttb_indices(x, y, n_out)
+    assert len(picked) == n_out
+    assert picked[0] == 0 and picked[-1] == n - 1
+    # One point from each bucket between the ends, so they come out strictly increasing
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    assert (np.diff(picked) > 0).all()
+    assert ((picked[1:-1] >= edges[:-1]) & (picked[1:-1] < edges[1:])).all()
+
+
+@pytest.mark.parametrize("n_out", [2, 100, 101])
+def test_lttb_returns_everything_it_cannot_reduce(n_out):
+    x, y = _signal(100)
+    assert lttb_indices(x, y, n_out).tolist() == list(range(100))
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(1000, dtype="float64")
+    y = np.zeros(1000)
+    y[437] = 50
+    assert 437 in lttb_indices(x, y, 20)
+
+
+# -------------------------
+# Per-line budgets
+# -------------------------
+
+@pytest.mark.parametrize("method", ["LTTB", "Min/Max"])
+@pytest.mark.parametrize("names", [["A"], ["A", "B", "C"], [str(line) for line in range(200)]])
+def test_every_line_stays_within_its_share(method, names):
+    df = _lines(20_000, names)
+    reduced, dropped = downsample_lines(df, "Timestamp", "Value", "Line", method, n_out=600)
+    per_line = max(600 // len(names), MIN_POINTS_PER_LINE)
+    # Min/Max keeps both ends on top of two points per bucket
+    assert reduced.groupby("Line").size().max() <= per_line + (2 if method == "Min/Max" else 0)
+    assert set(reduced["Line"]) == set(names)
+    assert dropped == len(df) - len(reduced)
+    # Rows keep their order and come from the original frame unchanged
+    assert reduced.index.is_monotonic_increasing
+    assert reduced.equals(df.loc[reduced.index])
+
+
+def test_keep_mask_rows_are_always_kept():
+    df = _lines(5000, ["A", "B"], seed=1)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[np.random.default_rng(2).choice(len(df), 40, replace=False)] = True
+    reduced, dropped = downsample_lines(df, "Timestamp", "Value", "Line", "LTTB", n_out=100, keep_mask=keep)
+    assert set(df.index[keep]) <= set(reduced.index)
+    assert dropped == len(df) - len(reduced)
+
+
+def test_off_returns_every_row():
+    df = _lines(5000, ["A", "B"])
+    reduced, dropped = downsample_lines(df, "Timestamp", "Value", "Line", "Off", n_out=100)
+    assert reduced is df and dropped == 0
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sessions import RECOVERY_MARGIN, RECOVERY_WINDOW, SESSION_COLUMNS, SESSION_LENGTH, session_features
+from trends import build_trends, trend_rows
+
+METRICS = ["Temperature", "Heart Rate", "SpO2"]
+START = pd.Timestamp("2024-01-01")
+
+
+def _vitals(n, seed=0):
+    # Readings about 5 s apart with a few long gaps, heart rate rising and falling around sessions
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([5, 5, 5, 5, 30, 900], n)
+    return pd.DataFrame({
+        "Timestamp": START + pd.to_timedelta(np.cumsum(gaps), "s"),
+        "Temperature": rng.normal(98.4, 0.3, n).astype("float32"),
+        "Heart Rate": (80 + np.cumsum(rng.normal(0, 2, n))).clip(50, 140).round().astype("float32"),
+        "SpO2": rng.normal(97, 1, n).round().clip(85, 100).astype("float32"),
+    })
+
+
+def _scores(vitals, n, seed=0):
+    # Scores at random times across the readings: one before the first reading, some closer together
+    # than a session, some past the last reading
+    rng = np.random.default_rng(seed)
+    span = (vitals["Timestamp"].iat[-1] - START).total_seconds() + 1200
+    seconds = np.sort(np.append(rng.choice(np.arange(1, int(span)), n - 1, replace=False), 0))
+    return pd.DataFrame({"Timestamp": START + pd.to_timedelta(seconds, "s"), "Score": rng.integers(0, 201, n).astype("float32")})
+
+
+def _naive(vitals, scores, trends):
+    times = vitals["Timestamp"]
+    rows = []
+    for i, score_time in enumerate(scores["Timestamp"]):
+        start = score_time - SESSION_LENGTH
+        if i > 0:
+            start = max(start, scores["Timestamp"].iat[i - 1])
+        end = score_time + RECOVERY_WINDOW
+        if i + 1 < len(scores):
+            end = min(end, scores["Timestamp"].iat[i + 1])
+
+        session = vitals[(times > start) & (times <= score_time)]
+        before = vitals.index[times <= start]
+        rest = trend_rows(trends, before[-1:], "Heart Rate", rolling=False)["Heart Rate baseline"].iat[0] if len(before) else np.nan
+        peak = session["Heart Rate"].max() if len(session) else np.nan
+
+        after = vitals[(times > score_time) & (times <= end)]
+        recovered = after["Timestamp"][after["Heart Rate"] <= np.float32(rest + RECOVERY_MARGIN)]
+        rows.append({
+            "Timestamp": score_time,
+            "Score": scores["Score"].iat[i],
+            "Readings": len(session),
+            "Rest HR": rest,
+            "Peak HR": peak,
+            "HR Rise": peak - rest,
+            "SpO2 Nadir": session["SpO2"].min() if len(session) else np.nan,
+            "Recovery (s)": (recovered.iat[0] - score_time).total_seconds() if len(recovered) else np.nan,
+        })
+    return pd.DataFrame(rows, columns=SESSION_COLUMNS)
+
+
+# -------------------------
+# Segmentation
+# -------------------------
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sessions_match_a_per_score_loop(seed):
+    vitals = _vitals(3000, seed)
+    scores = _scores(vitals, 120, seed)
+    trends = build_trends(vitals, METRICS)
+    table, finished = session_features(vitals, scores, trends)
+    expected = _naive(vitals, scores, trends)
+
+    assert table["Timestamp"].tolist() == expected["Timestamp"].tolist()
+    assert table["Readings"].tolist() == expected["Readings"].tolist()
+    for column in ["Score", "Rest HR", "Peak HR", "HR Rise", "SpO2 Nadir", "Recovery (s)"]:
+        np.testing.assert_allclose(table[column].to_numpy(dtype="float64"), expected[column].to_numpy(dtype="float64"), rtol=1e-6, err_msg=column)
+    # Empty sessions and ones without an earlier reading are covered
+    assert (expected["Readings"] == 0).any() and expected["Rest HR"].isna().any()
+
+    # Finished: a later score exists and the recovery window has closed before the last reading
+    closes = np.minimum(scores["Timestamp"] + RECOVERY_WINDOW, scores["Timestamp"].shift(-1).fillna(pd.Timestamp.max))
+    done = (np.arange(len(scores)) < len(scores) - 1) & (closes <= vitals["Timestamp"].iat[-1]).to_numpy()
+    assert finished == int(np.argmin(done)) and not done[finished:].any()
+
+
+def test_later_sessions_equal_the_tail_of_all_sessions():
+    vitals = _vitals(2000, seed=3)
+    scores = _scores(vitals, 80, seed=3)
+    trends = build_trends(vitals, METRICS)
+    table, finished = session_features(vitals, scores, trends)
+    tail, tail_finished = session_features(vitals, scores, trends, first=30)
+    assert tail.equals(table.iloc[30:].reset_index(drop=True))
+    assert tail_finished == max(finished - 30, 0)
+
@@ -0,0 +1,101 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+import sheets_client
+from benchmarks import synthetic
+from benchmarks.fake_sheets import FakeSheets
+from sheet_sync import CHECK_BLOCK_ROWS, add_listener, dataset_version, register_sheet, stored_frame, sync_error, sync_sheets
+
+SHEET = "Sheet2"
+_DATASETS = itertools.count()
+
+
+def _parse(df):
+    df = df.assign(Timestamp=pd.to_datetime(df["Date"] + " " + df["Time"], format="%d-%m-%Y %H:%M:%S"))
+    return df.astype({"Temperature": "float32", "Heart Rate": "float32", "SpO2": "float32"})
+
+
+def _expected(rows):
+    return _parse(pd.DataFrame(rows[1:], columns=rows[0]))
+
+
+@pytest.fixture
+def sheet():
+    # A fresh dataset on a fake spreadsheet; every change its listener sees goes on `changes`
+    rows = synthetic.vitals_rows(2 * CHECK_BLOCK_ROWS + 40)
+    fake = FakeSheets({SHEET: rows})
+    sheets_client.use_service(fake)
+    dataset = f"sync-test-{next(_DATASETS)}"
+    register_sheet(dataset, "spreadsheet", SHEET, "E", _parse)
+    changes = []
+    add_listener(dataset, "test", lambda frame, new_rows: changes.append(new_rows))
+    yield dataset, fake, changes
+    sheets_client.use_service(None)
+
+
+def _sync(dataset):
+    frame = sync_sheets([dataset], force=True)[dataset]
+    assert sync_error(dataset) is None
+    assert frame.equals(stored_frame(dataset))
+    return frame
+
+
+# -------------------------
+# Block-hash sync
+# -------------------------
+
+def test_first_sync_loads_the_whole_sheet(sheet):
+    dataset, fake, changes = sheet
+    assert _sync(dataset).equals(_expected(fake.sheets[SHEET]))
+    assert changes[-1] is None
+
+
+def test_appended_rows_arrive_as_a_delta(sheet):
+    dataset, fake, changes = sheet
+    _sync(dataset)
+    version = dataset_version(dataset)
+    # Enough rows to complete the partial block and start another
+    fake.append_rows(SHEET, synthetic.vitals_rows(300, first=2 * CHECK_BLOCK_ROWS + 40))
+    served = fake.rows_served
+
+    frame = _sync(dataset)
+    assert frame.equals(_expected(fake.sheets[SHEET]))
+    assert dataset_version(dataset) == version + 1
+    assert len(changes[-1]) == 300
+    assert changes[-1].reset_index(drop=True).equals(frame.iloc[-300:].reset_index(drop=True))
+    # Only the rows from the partial block on plus at most two check blocks, never the whole sheet again
+    assert fake.rows_served - served <= 40 + 300 + 2 * CHECK_BLOCK_ROWS
+
+
+def test_nothing_new_changes_nothing(sheet):
+    dataset, fake, changes = sheet
+    _sync(dataset)
+    version, seen = dataset_version(dataset), len(changes)
+    _sync(dataset)
+    assert dataset_version(dataset) == version and len(changes) == seen
+
+
+@pytest.mark.parametrize("row", [1, 2 * CHECK_BLOCK_ROWS + 10])
+def test_an_edited_row_reloads_everything(sheet, row):
+    # Row 1 sits in the first complete block (checked every sync), the other in the partial tail
+    dataset, fake, changes = sheet
+    _sync(dataset)
+    fake.sheets[SHEET][row] = fake.sheets[SHEET][row][:3] + ["150", fake.sheets[SHEET][row][4]]
+    fake.append_rows(SHEET, synthetic.vitals_rows(10, first=2 * CHECK_BLOCK_ROWS + 40))
+
+    frame = _sync(dataset)
+    assert frame.equals(_expected(fake.sheets[SHEET]))
+    assert frame["Heart Rate"].iat[row - 1] == 150
+    assert changes[-1] is None
+
+
+def test_a_deleted_row_reloads_everything(sheet):
+    dataset, fake, changes = sheet
+    _sync(dataset)
+    del fake.sheets[SHEET][5]
+
+    frame = _sync(dataset)
+    assert frame.equals(_expected(fake.sheets[SHEET]))
+    assert changes[-1] is None
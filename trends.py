@@ -0,0 +1,189 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sheet_sync import add_listener, stored_frame
+
+# -------------------------
+# Rolling Trends and Baselines
+# -------------------------
+# Per dataset we keep what is needed to compute the trend columns of any
+# synced frame rows on demand (trend_rows), with float32 columns per metric:
+#
+#   "<metric> mean <window>", "<metric> std <window>"
+#       rolling mean and standard deviation over the TREND_WINDOWS time window
+#       ending at the reading
+#   "<metric> baseline", "<metric> baseline std"
+#       exponentially weighted mean and standard deviation with a
+#       BASELINE_HALFLIFE half-life: the patient's own running baseline
+#
+# deviation() turns readings and their baseline into z-scores. Rolling columns
+# come from the frame rows inside the longest window before the requested
+# ones. The EWMA sums are carried along the frame and kept every
+# TREND_CHECKPOINT_ROWS rows, so baselines are computed from the checkpoint
+# before the requested rows; the latest carry gives latest_baseline() without
+# touching the rows at all. A sync append only carries the sums over the new
+# rows; only a full (re)load starts over. Nothing per row is stored besides the
+# frame itself.
+
+TREND_WINDOWS = {"5 min": "5min", "1 hour": "1h"}
+BASELINE_HALFLIFE = pd.Timedelta(days=1)
+BASELINE_BAND = 2  # standard deviations either side of the baseline shown on the charts
+EWM_BLOCK_HALFLIVES = 512  # span of one EWMA block; keeps the block's weights within float64
+TREND_CHECKPOINT_ROWS = 4096  # rows between kept EWMA carries; also the largest gap computed through
+
+_TRACKED = {}
+
+
+def _seconds(timestamps):
+    return timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+def _ewm(values, seconds, carry, halflife):
+    # Time-aware EWMA mean and std of `values`, continuing from `carry` = (time, weighted sum,
+    # weighted sum of squares, total weight), all decayed to that time; returns the new carry too
+    halflife = halflife.total_seconds()
+    t, s, s2, w = carry if carry is not None else (seconds[0], 0.0, 0.0, 0.0)
+    mean, var = np.empty(len(values)), np.empty(len(values))
+
+    start = 0
+    while start < len(values):
+        # Within a block, weights grow from 1 at its first reading instead of decaying
+        t0 = seconds[start]
+        end = max(np.searchsorted(seconds, t0 + EWM_BLOCK_HALFLIVES * halflife), start + 1)
+        growth = np.exp2((seconds[start:end] - t0) / halflife)
+        carried = np.exp2((t - t0) / halflife)
+        x = values[start:end]
+
+        block_s = s * carried + np.cumsum(x * growth)
+        block_s2 = s2 * carried + np.cumsum(x * x * growth)
+        block_w = w * carried + np.cumsum(growth)
+        mean[start:end] = block_s / block_w
+        var[start:end] = block_s2 / block_w - mean[start:end] ** 2
+
+        t, s, s2, w = seconds[end - 1], block_s[-1] / growth[-1], block_s2[-1] / growth[-1], block_w[-1] / growth[-1]
+        start = end
+    return mean, np.sqrt(var.clip(min=0)), (t, s, s2, w)
+
+
+def _rolling(frame, metrics, start, stop):
+    # Rolling columns for frame rows start:stop, with the earlier rows inside the longest window as context
+    longest = max(pd.Timedelta(window) for window in TREND_WINDOWS.values())
+    first = frame["Timestamp"].searchsorted(frame["Timestamp"].iat[start] - longest) if start else 0
+    context = frame.iloc[first:stop].set_index("Timestamp")[metrics].astype("float64")
+
+    columns = {}
+    for label, window in TREND_WINDOWS.items():
+        rolling = context.rolling(window)
+        means, stds = rolling.mean(), rolling.std()
+        for metric in metrics:
+            columns[f"{metric} mean {label}"] = means[metric].to_numpy()[start - first:]
+            columns[f"{metric} std {label}"] = stds[metric].to_numpy()[start - first:]
+    return columns
+
+
+def _baseline(frame, checkpoints, metric, start, stop):
+    # EWMA mean and std of frame rows start:stop, run from the checkpoint before them
+    first = start - start % TREND_CHECKPOINT_ROWS
+    rows = frame.iloc[first:stop]
+    mean, std, _ = _ewm(
+        rows[metric].to_numpy(dtype="float64"), _seconds(rows["Timestamp"]), checkpoints[first // TREND_CHECKPOINT_ROWS], BASELINE_HALFLIFE
+    )
+    return mean[start - first:], std[start - first:]
+
+
+def _extend(trends, frame, start):
+    # Carries the EWMA sums over frame rows start: (all rows when start is 0), keeping a checkpoint per block of rows
+    new = frame.iloc[start:]
+    seconds = _seconds(new["Timestamp"])
+    with trends["lock"]:
+        for metric in trends["metrics"]:
+            values, carry = new[metric].to_numpy(dtype="float64"), trends["carry"].get(metric)
+            checkpoints = trends["checkpoints"].setdefault(metric, [])
+            position = start
+            while position < len(frame):
+                if position % TREND_CHECKPOINT_ROWS == 0:
+                    checkpoints.append(carry)
+                stop = min(position - position % TREND_CHECKPOINT_ROWS + TREND_CHECKPOINT_ROWS, len(frame))
+                _, _, carry = _ewm(values[position - start:stop - start], seconds[position - start:stop - start], carry, BASELINE_HALFLIFE)
+                position = stop
+            trends["carry"][metric] = carry
+        trends["frame"] = frame
+
+
+def build_trends(frame, metrics):
+    trends = {"lock": threading.Lock(), "metrics": list(metrics), "frame": frame.iloc[:0], "checkpoints": {}, "carry": {}}
+    if not frame.empty:
+        _extend(trends, frame, 0)
+    return trends
+
+
+def _runs(index, size):
+    # (start, stop) row ranges covering the sorted rows in `index` below `size`; gaps up to TREND_CHECKPOINT_ROWS are computed through
+    rows = np.unique(np.asarray(index, dtype=np.int64))
+    rows = rows[(rows >= 0) & (rows < size)]
+    breaks = np.flatnonzero(np.diff(rows) > TREND_CHECKPOINT_ROWS) + 1
+    return [(run[0], run[-1] + 1) for run in np.split(rows, breaks) if len(run)]
+
+
+def trend_rows(trends, index, metric, rolling=True):
+    # Trend columns of `metric` for the frame rows labelled `index` (the frame's RangeIndex), NaN
+    # for rows not synced yet; only the baseline columns unless `rolling`
+    with trends["lock"]:
+        frame, checkpoints = trends["frame"], trends["checkpoints"].get(metric, [])
+
+    names = [f"{metric} {stat} {label}" for label in TREND_WINDOWS for stat in ["mean", "std"]] if rolling else []
+    names += [f"{metric} baseline", f"{metric} baseline std"]
+    parts = []
+    for start, stop in _runs(index, len(frame)):
+        columns = _rolling(frame, [metric], start, stop) if rolling else {}
+        columns[f"{metric} baseline"], columns[f"{metric} baseline std"] = _baseline(frame, checkpoints, metric, start, stop)
+        parts.append(pd.DataFrame(columns, index=pd.RangeIndex(start, stop))[names])
+    table = pd.concat(parts) if parts else pd.DataFrame(columns=names, dtype="float64")
+    return table.reindex(index).astype("float32")
+
+
+def latest_baseline(trends):
+    # {metric: EWMA baseline at its latest reading}
+    with trends["lock"]:
+        return {metric: s / w for metric, (_, s, _, w) in trends["carry"].items() if w > 0}
+
+
+def deviation(values, table, metric):
+    # Deviation of `values` from the baseline in `table` (trend_rows for the same index), in baseline standard deviations
+    std = table[f"{metric} baseline std"].where(table[f"{metric} baseline std"] > 0)
+    return (values - table[f"{metric} baseline"]) / std
+
+
+# -------------------------
+# Trends maintained from the sheet sync
+# -------------------------
+
+@st.cache_resource(show_spinner=False)
+def _trends():
+    return {}
+
+
+def track_trends(dataset, metrics):
+    _TRACKED[dataset] = metrics
+
+    def on_change(frame, new_rows):
+        trends = _trends()
+        if new_rows is None or dataset not in trends or trends[dataset]["frame"].empty:
+            trends[dataset] = build_trends(frame, metrics)
+        else:
+            _extend(trends[dataset], frame, len(frame) - len(new_rows))
+
+    add_listener(dataset, "trends", on_change)
+
+
+def get_trends(dataset):
+    trends = _trends()
+    if dataset not in trends:
+        # Restoring the frame notifies the listener above, which may already build the trends
+        frame = stored_frame(dataset)
+        if dataset not in trends:
+            trends[dataset] = build_trends(frame, _TRACKED[dataset])
+    return trends[dataset]
@@ -1,49 +1,104 @@
+import os
+
 import streamlit as st
 import pandas as pd
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+from alerts import ALERTS_DATASET, track_alerts
+from daily_stats import track_daily_rollup
+from patients import DEFAULT_PATIENT_ID, PATIENTS, patient_dataset, sheet_source
+from schema import VITALS_SCHEMA, add_time_keys, apply_schema, empty_frame
+from perf import span
+from pyramid import track_pyramid
+from sheet_sync import dataset_version, register_sheet, stored_frame, sync_error, sync_sheets
+from trends import track_trends
 
 # Constants
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SPREADSHEET_ID = "16pZcstLCjce244Os-_tzjazCNc90BgfoIky_3Y0vQAM"
+VITALS_DATASET = "vitals"
 VITALS_SHEET_NAME = "Sheet2"
+VITALS_LAST_COLUMN = "E"
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+VITAL_METRICS = ['Temperature', 'Heart Rate', 'SpO2']
+
+# Cache policy: how long a synced frame counts as fresh before Sheets is asked for new rows,
+# how many frame versions stay cached per patient, and whether sessions share one read-only
+# frame (ARCREHAB_SHARED_FRAMES=1) instead of each getting a copy
+VITALS_CACHE_POLICY = {
+    "ttl": 60,
+    "max_entries": 2,
+    "max_patients": 8,
+    "shared_frames": os.environ.get("ARCREHAB_SHARED_FRAMES") == "1",
+}
+
+
+def _clean_vitals(df):
+    df = df[df['Date'] != '']
+
+    # Parse Date and Time once into the canonical Timestamp; the date and time keys are derived from it
+    df['Timestamp'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], format=TIMESTAMP_FORMAT, errors='coerce')
+    df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
+    df['Heart Rate'] = pd.to_numeric(df['Heart Rate'], errors='coerce')
+    df['SpO2'] = pd.to_numeric(df['SpO2'], errors='coerce')
+    df = add_time_keys(df.dropna(subset=['Timestamp', 'Temperature', 'Heart Rate', 'SpO2']))
+
+    if not df['Timestamp'].is_monotonic_increasing:
+        df = df.sort_values('Timestamp', kind='stable')
+    return apply_schema(df, VITALS_SCHEMA)
+
+
+def vitals_dataset(patient_id=DEFAULT_PATIENT_ID):
+    return patient_dataset(patient_id, VITALS_DATASET)
+
+
+def alerts_dataset(patient_id=DEFAULT_PATIENT_ID):
+    return patient_dataset(patient_id, ALERTS_DATASET)
+
+
+for _patient in PATIENTS.values():
+    _spreadsheet_id, _sheet_name = sheet_source(_patient, "vitals_sheet", SPREADSHEET_ID, VITALS_SHEET_NAME)
+    register_sheet(vitals_dataset(_patient["id"]), _spreadsheet_id, _sheet_name, VITALS_LAST_COLUMN, _clean_vitals, ttl=VITALS_CACHE_POLICY["ttl"])
+    track_daily_rollup(vitals_dataset(_patient["id"]), VITAL_METRICS)
+    track_trends(vitals_dataset(_patient["id"]), VITAL_METRICS)
+    track_pyramid(vitals_dataset(_patient["id"]), VITAL_METRICS)
+    track_alerts(vitals_dataset(_patient["id"]), alerts_dataset(_patient["id"]), _patient["name"] if len(PATIENTS) > 1 else None)
+
+
+@st.cache_data(show_spinner=False, max_entries=VITALS_CACHE_POLICY["max_entries"] * VITALS_CACHE_POLICY["max_patients"])
+def _vitals_frame(dataset, version):
+    # Keyed on the dataset version, so a sync that brings new rows invalidates only this dataset
+    return stored_frame(dataset)
+
+
+def load_data_from_gsheets(patient_id=DEFAULT_PATIENT_ID):
+    with span("load.vitals", patient=patient_id) as s:
+        frame = _load_vitals(patient_id)
+        s.set(rows=len(frame))
+    return frame
+
+
+def _load_vitals(patient_id):
+    # Fetch only the readings appended since the last sync once the TTL ran out; the patient's scores ride along in the same batch
+    dataset = vitals_dataset(patient_id)
+    sync_sheets([dataset, patient_dataset(patient_id, "scores")])
+
+    error = sync_error(dataset)
+    if error is not None:
+        # Keep serving the local store when Google Sheets is slow or unavailable
+        if stored_frame(dataset).empty:
+            st.error(f"Error loading data from Google Sheets: {error}")
+            return empty_frame(VITALS_SCHEMA)
+        st.warning(f"Google Sheets unavailable, showing stored readings: {error}")
+
+    if VITALS_CACHE_POLICY["shared_frames"]:
+        # Shared across sessions: callers must not modify it in place
+        frame = stored_frame(dataset)
+    else:
+        # cache_data hands every session its own copy of the frame
+        with span("load.cache_copy", dataset=dataset):
+            frame = _vitals_frame(dataset, dataset_version(dataset))
+    # Patients without any rows yet still get the typed columns
+    return frame if not frame.empty else empty_frame(VITALS_SCHEMA)
+
 
-@st.cache_data(show_spinner=False)
-def load_data_from_gsheets():
-    try:
-        # Read credentials from Streamlit secrets
-        service_account_info = dict(st.secrets["google_service_account"])
-        
-        # Fix multiline private key if necessary
-        if isinstance(service_account_info['private_key'], str) and "\\n" in service_account_info['private_key']:
-            service_account_info['private_key'] = service_account_info['private_key'].replace("\\n", "\n")
-
-        creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
-        service = build("sheets", "v4", credentials=creds)
-        sheet = service.spreadsheets()
-
-        # Fetch data
-        result = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=VITALS_SHEET_NAME).execute()
-        values = result.get("values", [])
-
-        if not values:
-            return pd.DataFrame()
-
-        headers, data = values[0], values[1:]
-        df = pd.DataFrame(data, columns=headers)
-
-        # Clean and process DataFrame
-        df = df[df['Date'] != '']
-        df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', errors='coerce')
-        df['Time'] = pd.to_datetime(df['Time'], format='%H:%M:%S', errors='coerce').dt.time
-        df['Temperature'] = pd.to_numeric(df['Temperature'], errors='coerce')
-        df['Heart Rate'] = pd.to_numeric(df['Heart Rate'], errors='coerce')
-        df['SpO2'] = pd.to_numeric(df['SpO2'], errors='coerce')
-        df = df.dropna()
-        df['Timestamp'] = pd.to_datetime(df['Date'].astype(str) + ' ' + df['Time'].astype(str))
-
-        return df
-
-    except Exception as e:
-        st.error(f"Error loading data from Google Sheets: {e}")
-        return pd.DataFrame()
+def refresh_vitals(patient_id=DEFAULT_PATIENT_ID):
+    # Targeted refresh: re-syncs only this patient's vitals, other cached data stays untouched
+    sync_sheets([vitals_dataset(patient_id)], force=True)
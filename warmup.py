@@ -0,0 +1,117 @@
+import importlib
+import logging
+import threading
+import time
+
+# -------------------------
+# Server Warm-Up
+# -------------------------
+# prewarm() starts one background thread per process that does the work the
+# first data page would otherwise pay for, one step at a time:
+#
+#   imports  - WARM_MODULES and one throwaway figure, which loads plotly's trace
+#              validators
+#   client   - the Google Sheets credentials and discovery service
+#   datasets - a sync of every patient's vitals and scores (the sync listeners
+#              build the rollups, trends, pyramid and alert state from it), then
+#              the loaders' cached frames and their day indexes
+#
+# app.py calls it from the server's startup hook. ARCHAB.py calls it as well, so
+# a server started with `streamlit run ARCHAB.py` warms up on the first visit.
+# Pages never wait for it: they do whatever it has not reached yet themselves,
+# and a sync it already started is joined (page_data.start_loading). A failed
+# step is logged and skipped; the pages then retry and report it as usual.
+#
+# This module only imports the standard library at the top, so the intro page
+# stays as light as it was. page_ready() (called by perf.perf_panel at the end
+# of every data page) records the time to the first useful page: from this
+# module's import (server start under app.py) to the end of the first data
+# page run in the process.
+
+WARM_MODULES = ["plotly.express", "figures", "analytics", "exports", "pyramid", "sessions"]
+
+STARTED = time.perf_counter()
+
+logger = logging.getLogger("arcrehab.warmup")
+
+_STATE = {"thread": None, "steps": {}, "errors": {}, "finished": None, "first_page": None}
+_LOCK = threading.Lock()
+
+
+def _import_modules():
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+    import pandas as pd
+    import plotly.express as px
+
+    px.line(pd.DataFrame({"x": [0, 1], "y": [0, 1]}), x="x", y="y").to_json()
+
+
+def _connect():
+    import sheets_client
+
+    sheets_client.warm_up()
+
+
+def _load_datasets():
+    import query
+    from page_data import LOADERS, start_loading
+    from patients import PATIENTS
+    from sheet_sync import sync_error
+
+    futures = [start_loading(patient_id) for patient_id in PATIENTS]
+    for patient_id, future in zip(PATIENTS, futures):
+        future.result()
+        for dataset, load in LOADERS.values():
+            # The loaders report sync errors on the page, so those datasets are left to the page
+            if sync_error(dataset(patient_id)) is not None:
+                continue
+            frame = load(patient_id)
+            if not frame.empty:
+                query.day_index(frame)
+
+
+WARM_STEPS = [("imports", _import_modules), ("client", _connect), ("datasets", _load_datasets)]
+
+
+def _run():
+    from perf import span
+
+    for name, step in WARM_STEPS:
+        started = time.perf_counter()
+        try:
+            with span(f"warmup.{name}"):
+                step()
+        except Exception as exc:
+            _STATE["errors"][name] = f"{type(exc).__name__}: {exc}"
+            logger.warning("Warm-up step %s failed: %s", name, exc)
+        _STATE["steps"][name] = time.perf_counter() - started
+    _STATE["finished"] = time.perf_counter() - STARTED
+    logger.info("Warm-up finished in %.2fs: %s", _STATE["finished"], {name: round(seconds, 2) for name, seconds in _STATE["steps"].items()})
+
+
+def prewarm():
+    # Starts the warm-up once per process and returns without waiting for it
+    with _LOCK:
+        if _STATE["thread"] is None:
+            _STATE["thread"] = threading.Thread(target=_run, name="warmup", daemon=True)
+            _STATE["thread"].start()
+        return _STATE["thread"]
+
+
+def page_ready():
+    with _LOCK:
+        if _STATE["first_page"] is None:
+            _STATE["first_page"] = time.perf_counter() - STARTED
+            logger.info("First page ready %.2fs after startup (warm-up %s)", _STATE["first_page"], "finished" if _STATE["finished"] is not None else "still running")
+
+
+def status():
+    # Seconds per warm-up step, failed steps, and the startup timings (None until they happen)
+    return {
+        "steps": dict(_STATE["steps"]),
+        "errors": dict(_STATE["errors"]),
+        "warmup_seconds": _STATE["finished"],
+        "first_page_seconds": _STATE["first_page"],
+    }